@@ -0,0 +1,331 @@
+"""
+Two-tier cache: a per-process LRU in front of Redis.
+"""
+import asyncio
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, TypeVar
+
+from fastapi import Request
+from prometheus_client import Counter, Gauge
+from redis.asyncio import Redis
+
+from app.core.config import get_infra_settings
+from app.core.redis import redis_binary_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by tier and result",
+    ["tier", "result"],
+)
+
+ORIGIN_CALLS_SAVED = Counter(
+    "cache_origin_calls_saved_total",
+    "Cache misses served from another request's origin call instead of their own",
+    ["scope"],  # "worker": same process, "cluster": another worker, via the fill lock
+)
+
+LOCAL_CACHE_BYTES = Gauge(
+    "cache_local_bytes",
+    "Approximate size of the entries in the in-process cache tier",
+)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+TAG_KEY_PREFIX = "cache:tag:"
+LOCK_KEY_PREFIX = "cache:lock:"
+LOCK_POLL_INTERVAL = 0.05
+# Tag sets outlive any entry they list, so no entry can lose its tags
+TAG_TTL = 24 * 60 * 60
+
+
+def contacts_cache_tag(user_id: int) -> str:
+    """Tag of cached responses derived from one user's contacts."""
+    return f"contacts:user:{user_id}"
+
+# Delete the lock only if it still holds our token (it may have expired and been retaken)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+T = TypeVar("T")
+
+
+class FlightAbandoned(Exception):
+    """The request computing a shared result was cancelled before finishing."""
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one.
+
+    The first caller runs fn; callers arriving while it runs wait for and
+    share its result (or exception) instead of calling fn themselves.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Return fn's result and whether it came from another caller's call."""
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except BaseException as exc:
+            future.set_exception(FlightAbandoned() if isinstance(exc, asyncio.CancelledError) else exc)
+            future.exception()  # retrieved, so an unshared failure is not logged twice
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+
+class _LocalEntry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+
+
+class LocalCache:
+    """In-process LRU cache bounded by total entry size in bytes, with per-entry TTL.
+
+    Sizes are supplied by the caller (the serialized length of the value).
+    Entries larger than max_entry_bytes are not kept at all.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None, max_ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self.max_ttl = max_ttl
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, _LocalEntry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: Any, size: int, ttl: float):
+        self.delete(key)
+        if size > self.max_entry_bytes:
+            return
+        if self.max_ttl is not None:
+            ttl = min(ttl, self.max_ttl)
+        self._entries[key] = _LocalEntry(value, size, time.monotonic() + ttl)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= evicted.size
+        LOCAL_CACHE_BYTES.set(self.size_bytes)
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry.size
+            LOCAL_CACHE_BYTES.set(self.size_bytes)
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+        LOCAL_CACHE_BYTES.set(0)
+
+
+class TieredCache:
+    """Byte strings cached in a LocalCache and in Redis.
+
+    The Redis client must not decode responses.
+
+    Reads try the local tier, then Redis, copying Redis hits into the local
+    tier. invalidate() deletes from Redis and publishes the keys so every
+    worker drops its local copy; start() runs that subscriber.
+
+    Entries can carry tags naming the data they were built from; each tag
+    is a Redis set of keys, and invalidate_tags() purges every key listed.
+    """
+
+    def __init__(self, redis: Redis, local: LocalCache, channel: str = INVALIDATION_CHANNEL):
+        self.redis = redis
+        self.local = local
+        self.channel = channel
+        self._subscriber: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(tier="local", result="hit").inc()
+            return value
+        CACHE_REQUESTS.labels(tier="local", result="miss").inc()
+        return await self.get_shared(key)
+
+    async def get_shared(self, key: str) -> Optional[bytes]:
+        """Read key from Redis, skipping (and then replacing) the local copy."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.ttl(key)
+            value, ttl = await pipe.execute()
+        if value is None:
+            CACHE_REQUESTS.labels(tier="redis", result="miss").inc()
+            return None
+        CACHE_REQUESTS.labels(tier="redis", result="hit").inc()
+        if ttl > 0:
+            self.local.set(key, value, len(value), ttl)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str] = ()):
+        self.local.set(key, value, len(value), ttl)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.setex(key, ttl, value)
+            for tag in tags:
+                pipe.sadd(TAG_KEY_PREFIX + tag, key)
+                pipe.expire(TAG_KEY_PREFIX + tag, TAG_TTL)
+            await pipe.execute()
+
+    async def acquire_lock(self, key: str, timeout: float) -> Optional[str]:
+        """Take the cross-worker fill lock for key; return its token, or None if held."""
+        token = secrets.token_hex(8)
+        acquired = await self.redis.set(LOCK_KEY_PREFIX + key, token, nx=True, px=int(timeout * 1000))
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str):
+        await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, LOCK_KEY_PREFIX + key, token)
+
+    async def wait_for(self, key: str, timeout: float) -> Optional[bytes]:
+        """Poll for key to be filled by the lock holder, for up to timeout seconds.
+
+        Returns None early if the lock is released without the key being filled.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            # Read both at once: the holder fills the key before releasing the lock
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.get(key)
+                pipe.exists(LOCK_KEY_PREFIX + key)
+                value, locked = await pipe.execute()
+            if value is not None:
+                return value
+            if not locked:
+                return None
+        return None
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        """Invalidate every entry stored with any of tags."""
+        tag_keys = [TAG_KEY_PREFIX + tag for tag in tags]
+        if not tag_keys:
+            return
+        # Read and drop each tag set atomically, so keys tagged meanwhile
+        # land in a fresh set rather than being dropped unpurged
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+                pipe.delete(tag_key)
+            results = await pipe.execute()
+        keys = set()
+        for members in results[0::2]:
+            keys.update(member.decode() for member in members)
+        await self.invalidate(keys)
+
+    async def invalidate(self, keys: Iterable[str]):
+        keys = list(keys)
+        if not keys:
+            return
+        for key in keys:
+            self.local.delete(key)
+        await self.redis.delete(*keys)
+        await self.redis.publish(self.channel, json.dumps(keys))
+
+    def start(self):
+        """Start listening for invalidations from other workers."""
+        if self._subscriber is None:
+            self._subscriber = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            try:
+                await self._subscriber
+            except asyncio.CancelledError:
+                pass
+            self._subscriber = None
+
+    async def _listen(self):
+        backoff = 1.0
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Anything published while unsubscribed was missed
+                    self.local.clear()
+                    backoff = 1.0
+                    while True:
+                        message = await pubsub.get_message(timeout=1.0)
+                        if message is not None:
+                            for key in json.loads(message["data"]):
+                                self.local.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Cache invalidation subscriber failed, retrying in %.0fs: %s", backoff, exc)
+                self.local.clear()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+settings = get_infra_settings()
+
+# Response cache shared by CacheMiddleware; started with the application
+response_cache = TieredCache(
+    redis_binary_client,
+    LocalCache(max_bytes=settings.cache_local_max_bytes, max_ttl=settings.cache_local_ttl),
+)
+
+
+def tag_response(request: Request, *tags: str):
+    """Tag the response to request, so CacheMiddleware stores it under tags."""
+    request.state.cache_tags = [*getattr(request.state, "cache_tags", []), *tags]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against etag, using weak comparison as for GET."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+async def purge_tags(*tags: str):
+    """Invalidate cached responses tagged with any of tags, from a write path.
+
+    Failures are logged rather than raised: the write itself succeeded.
+    """
+    try:
+        await response_cache.invalidate_tags(tags)
+    except Exception:
+        logger.exception("Could not purge cache tags %s", ", ".join(tags))
@@ -0,0 +1,189 @@
+"""
+Prometheus metrics and per-request instrumentation for database engines.
+"""
+import re
+import time
+from collections import Counter as TallyCounter
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Connection checkouts that gave up after pool_timeout",
+    ["engine"],
+)
+
+POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out of the pool",
+    ["engine"],
+)
+
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size",
+    ["engine"],
+)
+
+POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured number of persistent connections",
+    ["engine"],
+)
+
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while handling one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+)
+
+REQUEST_DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent executing SQL while handling one request",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+REQUEST_N_PLUS_ONE = Counter(
+    "db_suspected_n_plus_one_total",
+    "Requests that repeated one statement shape at least N_PLUS_ONE_THRESHOLD times",
+    ["route"],
+)
+
+READ_SESSIONS = Counter(
+    "db_read_sessions_total",
+    "Read-only sessions opened, by the engine they were routed to",
+    ["engine"],
+)
+
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of the read replica at its last check",
+)
+
+REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "Whether reads are routed to the replica (1) or fall back to the primary (0)",
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Async queue pool that reports checkout waits and usage per engine.
+
+    The engine label is the pool's logging name, set with
+    create_async_engine(..., pool_logging_name=...).
+    """
+
+    @property
+    def engine_label(self) -> str:
+        return self._orig_logging_name or "default"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(engine=self.engine_label).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(engine=self.engine_label).observe(time.perf_counter() - start)
+        self._report()
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report()
+
+    def _report(self):
+        label = self.engine_label
+        POOL_IN_USE.labels(engine=label).set(self.checkedout())
+        # overflow() counts up from -pool_size, so only positive values are extra connections
+        POOL_OVERFLOW.labels(engine=label).set(max(self.overflow(), 0))
+        POOL_SIZE.labels(engine=label).set(self.size())
+
+
+# A statement shape repeated this many times in one request is flagged as a likely N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|\?|:\w+")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL string so executions differing only in parameters compare equal."""
+    shape = _PLACEHOLDER.sub("?", statement)
+    shape = _PLACEHOLDER_LIST.sub("?", shape)  # expanded IN lists of any length
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """SQL executed on behalf of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes: TallyCounter = TallyCounter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+        """Statement shapes executed at least threshold times, likely N+1s."""
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+
+# Set per request by QueryStatsMiddleware; the hooks below add to it
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _record(statement: str, start: float):
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(statement, conn.info["query_start"].pop())
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start
+    # time here, or it stays on the pooled connection for good
+    if context.connection is None or context.execution_context is None:
+        return
+    starts = context.connection.info.get("query_start")
+    if starts:
+        _record(context.statement or "", starts.pop())
+
+
+def instrument_engine(engine: Engine):
+    """Attach the per-request query hooks to a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,389 @@
+"""
+Request middleware for Opero platform
+"""
+import gzip
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from fastapi import Request, Response
+from starlette.background import BackgroundTask
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.cache import (
+    ORIGIN_CALLS_SAVED,
+    FlightAbandoned,
+    SingleFlight,
+    TieredCache,
+    etag_matches,
+    response_cache,
+)
+from app.core.config import get_infra_settings
+from app.core.db_metrics import (
+    REQUEST_DB_TIME,
+    REQUEST_N_PLUS_ONE,
+    REQUEST_QUERIES,
+    QueryStats,
+    current_query_stats,
+)
+
+try:
+    import zstandard
+except ImportError:  # optional; cached responses fall back to gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+settings = get_infra_settings()
+
+MAX_STATEMENT_HEADER_LENGTH = 200
+
+# Origin headers not stored with a cached response: recomputed on each hit, or per request
+_UNCACHED_HEADERS = {"content-length", "content-encoding", "date", "set-cookie"}
+_UNCACHED_HEADER_PREFIXES = (
+    "x-db-",  # describe the queries of the request that filled the entry
+    "access-control-",  # CORS headers depend on the requesting origin
+)
+
+# Stripped from origin calls: the cache needs the full response, not a 304 for one client
+_CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since", "if-match", "if-unmodified-since", "if-range")
+
+
+class CachePolicy(NamedTuple):
+    """How long CacheMiddleware keeps responses for a path.
+
+    Responses are fresh for soft_ttl seconds. From then until hard_ttl they
+    are still served, marked stale, while a background request refreshes
+    them; if the refresh fails they keep being served until hard_ttl.
+    """
+    soft_ttl: int
+    hard_ttl: int
+
+
+class CachedResponse(NamedTuple):
+    """A response stored by CacheMiddleware, as the origin sent it.
+
+    body is compressed with encoding ("zstd", "gzip" or None). Stored as a
+    line of JSON metadata followed by the body, so reading an entry never
+    parses the body itself.
+    """
+    stored_at: float
+    status_code: int
+    headers: List[Tuple[str, str]]
+    encoding: Optional[str]
+    body: bytes
+
+    def dumps(self) -> bytes:
+        meta = json.dumps([self.stored_at, self.status_code, self.headers, self.encoding])
+        return meta.encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedResponse":
+        meta, _, body = raw.partition(b"\n")
+        stored_at, status_code, headers, encoding = json.loads(meta)
+        return cls(stored_at, status_code, headers, encoding, body)
+
+
+def _compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def _decompress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompress(body)
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+def _strip_conditional_headers(request: Request) -> Request:
+    """Remove conditional headers from the request the origin will see.
+
+    call_next always passes on request's own scope, so its headers are
+    replaced in place. Returns a Request that still carries them, for
+    answering the client.
+    """
+    client_request = Request(dict(request.scope))
+    request.scope["headers"] = [
+        (name, value) for name, value in request.scope["headers"]
+        if name.decode("latin-1") not in _CONDITIONAL_HEADERS
+    ]
+    return client_request
+
+
+def _accepts_encoding(request: Request, encoding: str) -> bool:
+    """Whether the client's Accept-Encoding allows encoding."""
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        if name.strip().lower() == encoding:
+            try:
+                return not params or float(params.strip().removeprefix("q=")) > 0
+            except ValueError:
+                return True
+    return False
+
+
+class _OriginResult(NamedTuple):
+    """A response read from the origin, shareable between coalesced requests."""
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    entry: Optional[CachedResponse]  # set when the response was cached
+
+
+class CacheMiddleware(BaseHTTPMiddleware):
+    """Two-tier (in-process, then Redis) caching middleware
+
+    Routes tag their responses with tag_response(); write paths call
+    purge_tags() so tagged entries can live for a long TTL.
+
+    Concurrent misses for one key are coalesced: within a worker they wait
+    for a single origin call, and with distributed_lock the first worker to
+    take a short Redis lock fills the key while the others poll for it.
+
+    Each path prefix has a CachePolicy; responses carry X-Cache (HIT, STALE
+    or MISS) and, when served from the cache, Age.
+
+    Entries are the origin's status, headers and body bytes, so a hit is
+    sent as stored. Bodies of compression_min_bytes or more are compressed,
+    and sent compressed to clients that accept the encoding.
+    """
+    
+    def __init__(
+        self,
+        app,
+        cache_ttl: int = 300,
+        cache: TieredCache = response_cache,
+        distributed_lock: bool = settings.cache_distributed_lock,
+        lock_timeout: float = settings.cache_lock_timeout,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        compression: str = settings.cache_compression,
+        compression_min_bytes: int = settings.cache_compression_min_bytes,
+    ):
+        super().__init__(app)
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; compressing cached responses with gzip")
+            compression = "gzip"
+        self.cache = cache
+        self.compression = None if compression == "none" else compression
+        self.compression_min_bytes = compression_min_bytes
+        self.distributed_lock = distributed_lock
+        self.lock_timeout = lock_timeout
+        self.single_flight = SingleFlight()
+        self.cacheable_methods = {"GET"}
+        # Dashboards would rather show slightly old numbers than wait; health checks would not
+        self.policies = policies or {
+            "/contacts/stats": CachePolicy(cache_ttl, cache_ttl * 12),
+            "/agent/analytics": CachePolicy(cache_ttl, cache_ttl * 12),
+            "/health": CachePolicy(cache_ttl, cache_ttl),
+            "/info": CachePolicy(cache_ttl, cache_ttl * 12),
+        }
+    
+    async def dispatch(self, request: Request, call_next):
+        # Only cache GET requests to specific paths
+        policy = self._policy_for(request.url.path) if request.method in self.cacheable_methods else None
+        if policy is None:
+            return await call_next(request)
+        
+        # Generate cache key
+        cache_key = self._generate_cache_key(request)
+        client_request = _strip_conditional_headers(request)
+        
+        # Try to get from cache
+        try:
+            raw = await self.cache.get(cache_key)
+            if raw is not None:
+                entry = CachedResponse.loads(raw)
+                age = max(time.time() - entry.stored_at, 0)
+                if age < policy.soft_ttl:
+                    return self._cached_response(client_request, entry, "HIT", age)
+                if age < policy.hard_ttl:
+                    response = self._cached_response(client_request, entry, "STALE", age)
+                    if cache_key not in self.single_flight:
+                        # Runs once the stale response has been sent
+                        response.background = BackgroundTask(self._refresh, request, call_next, cache_key, policy)
+                    return response
+        except Exception:
+            pass  # Cache miss or error, continue to origin
+        
+        result = await self._coalesced_fill(request, call_next, cache_key, policy)
+        
+        if result.entry is None:
+            return Response(content=result.body, status_code=result.status_code, headers=result.headers)
+        
+        # Return response with cache headers
+        return self._cached_response(client_request, result.entry, "MISS")
+    
+    async def _coalesced_fill(self, request: Request, call_next, cache_key: str, policy: CachePolicy) -> _OriginResult:
+        """Fill a missed key, with one origin call per key at a time in this worker."""
+        try:
+            result, shared = await self.single_flight.run(
+                cache_key, lambda: self._fill(request, call_next, cache_key, policy)
+            )
+        except FlightAbandoned:
+            return await self._fetch(request, call_next, cache_key, policy)
+        if not shared:
+            return result
+        if result.entry is None:
+            # Only cached responses are shared; anything else may not apply to this request
+            return await self._fetch(request, call_next, cache_key, policy)
+        ORIGIN_CALLS_SAVED.labels(scope="worker").inc()
+        return result
+    
+    def _policy_for(self, path: str) -> Optional[CachePolicy]:
+        return next((policy for prefix, policy in self.policies.items() if path.startswith(prefix)), None)
+    
+    def _cached_response(
+        self, request: Request, entry: CachedResponse, status: str, age: Optional[float] = None
+    ) -> Response:
+        headers = dict(entry.headers)
+        etag = headers.get("etag")
+        if etag is not None and etag_matches(request, etag):
+            not_modified = {"ETag": etag, "X-Cache": status}
+            if age is not None:
+                not_modified["Age"] = str(int(age))
+            return Response(status_code=304, headers=not_modified)
+        body = entry.body
+        if entry.encoding is not None:
+            if _accepts_encoding(request, entry.encoding):
+                headers["Content-Encoding"] = entry.encoding
+            else:
+                body = _decompress(body, entry.encoding)
+            vary = headers.pop("vary", "")
+            if "accept-encoding" not in vary.lower():
+                vary = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+            headers["Vary"] = vary
+        headers["X-Cache"] = status
+        if age is not None:
+            headers["Age"] = str(int(age))
+        return Response(content=body, status_code=entry.status_code, headers=headers)
+    
+    def _make_entry(self, response: Response, body: bytes) -> CachedResponse:
+        encoding = self.compression if len(body) >= self.compression_min_bytes else None
+        headers = [
+            (name, value) for name, value in response.headers.items()
+            if name not in _UNCACHED_HEADERS and not name.startswith(_UNCACHED_HEADER_PREFIXES)
+        ]
+        return CachedResponse(time.time(), response.status_code, headers, encoding, _compress(body, encoding))
+    
+    async def _fill(self, request: Request, call_next, cache_key: str, policy: CachePolicy) -> _OriginResult:
+        """Fill a missed key, deferring to another worker that is already filling it."""
+        token = None
+        if self.distributed_lock:
+            try:
+                token = await self.cache.acquire_lock(cache_key, self.lock_timeout)
+                if token is None:
+                    raw = await self.cache.wait_for(cache_key, self.lock_timeout)
+                    if raw is not None:
+                        ORIGIN_CALLS_SAVED.labels(scope="cluster").inc()
+                        entry = CachedResponse.loads(raw)
+                        return _OriginResult(entry.status_code, {}, b"", entry)
+                    # The holder gave up without filling it, or took too long; call the origin ourselves
+            except Exception:
+                pass  # Redis unavailable; fill without the lock
+        try:
+            return await self._fetch(request, call_next, cache_key, policy)
+        finally:
+            if token is not None:
+                await self._release_lock(cache_key, token)
+    
+    async def _refresh(self, request: Request, call_next, cache_key: str, policy: CachePolicy):
+        """Replace a stale entry from the origin; if that fails the stale entry stays."""
+        token = None
+        try:
+            # Another worker may have refreshed it since this one cached it locally
+            raw = await self.cache.get_shared(cache_key)
+            if raw is not None and time.time() - CachedResponse.loads(raw).stored_at < policy.soft_ttl:
+                return
+            if self.distributed_lock:
+                token = await self.cache.acquire_lock(cache_key, self.lock_timeout)
+                if token is None:
+                    return  # Another worker is refreshing it
+            result, _ = await self.single_flight.run(
+                cache_key, lambda: self._fetch(request, call_next, cache_key, policy)
+            )
+            if result.entry is None:
+                logger.warning("Refreshing %s returned %d; serving stale", request.url.path, result.status_code)
+        except Exception:
+            logger.warning("Refreshing %s failed; serving stale", request.url.path, exc_info=True)
+        finally:
+            if token is not None:
+                await self._release_lock(cache_key, token)
+    
+    async def _release_lock(self, cache_key: str, token: str):
+        try:
+            await self.cache.release_lock(cache_key, token)
+        except Exception:
+            pass  # The lock expires on its own
+    
+    async def _fetch(self, request: Request, call_next, cache_key: str, policy: CachePolicy) -> _OriginResult:
+        """Call the origin and cache a successful response."""
+        # request.state is shared with the route, which records its cache tags there
+        request.state.cache_tags = []
+        response = await call_next(request)
+        
+        # Read response body
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        result = _OriginResult(response.status_code, dict(response.headers), body, None)
+        
+        # Cache successful responses the origin did not encode itself
+        if response.status_code == 200 and "content-encoding" not in response.headers:
+            try:
+                # Entries outlive soft_ttl to be served stale
+                entry = self._make_entry(response, body)
+                await self.cache.set(cache_key, entry.dumps(), policy.hard_ttl, tags=request.state.cache_tags)
+            except Exception:
+                return result  # Don't cache on error
+            return result._replace(entry=entry)
+        return result
+    
+    def _generate_cache_key(self, request: Request) -> str:
+        """Generate cache key from request"""
+        key_data = f"{request.method}:{request.url.path}:{request.url.query}"
+        return f"cache:{hashlib.md5(key_data.encode()).hexdigest()}"
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Per-request SQL count, time and slowest statement, with N+1 detection.
+
+    Metrics are labelled by route template (/contacts/{contact_id}), not by
+    path. With debug on, the numbers are also returned as X-DB-* headers.
+    """
+
+    def __init__(self, app, debug: bool = False):
+        super().__init__(app)
+        self.debug = debug
+
+    async def dispatch(self, request: Request, call_next):
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            current_query_stats.reset(token)
+
+        route = request.scope.get("route")
+        route_label = getattr(route, "path", None) or "<unmatched>"
+        REQUEST_QUERIES.labels(route=route_label).observe(stats.count)
+        REQUEST_DB_TIME.labels(route=route_label).observe(stats.total_time)
+
+        repeated = stats.repeated_shapes()
+        if repeated:
+            REQUEST_N_PLUS_ONE.labels(route=route_label).inc()
+            for shape, count in repeated.items():
+                logger.warning("Likely N+1 in %s %s: %d x %s", request.method, route_label, count, shape)
+
+        if self.debug:
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Time-Ms"] = f"{stats.total_time * 1000:.2f}"
+            if stats.slowest_statement is not None:
+                response.headers["X-DB-Slowest-Ms"] = f"{stats.slowest_time * 1000:.2f}"
+                statement = " ".join(stats.slowest_statement.split())[:MAX_STATEMENT_HEADER_LENGTH]
+                response.headers["X-DB-Slowest-Statement"] = statement.encode("ascii", "replace").decode()
+            if repeated:
+                response.headers["X-DB-N-Plus-One"] = str(len(repeated))
+        return response
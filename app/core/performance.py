@@ -2,90 +2,15 @@
 Performance optimization middleware and caching for Opero platform
 """
 import time
-import redis
-import json
 import hashlib
-from typing import Any, Optional
+from typing import NamedTuple, Optional
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from app.core.config import get_settings
+from app.core.config import get_infra_settings
+from app.core.redis import redis_client
 
-settings = get_settings()
-
-# Redis client for caching
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
-
-
-class CacheMiddleware(BaseHTTPMiddleware):
-    """Redis-based caching middleware"""
-    
-    def __init__(self, app, cache_ttl: int = 300):
-        super().__init__(app)
-        self.cache_ttl = cache_ttl
-        self.cacheable_methods = {"GET"}
-        self.cacheable_paths = {
-            "/contacts/stats",
-            "/agent/analytics",
-            "/health",
-            "/info"
-        }
-    
-    async def dispatch(self, request: Request, call_next):
-        # Only cache GET requests to specific paths
-        if (request.method not in self.cacheable_methods or 
-            not any(request.url.path.startswith(path) for path in self.cacheable_paths)):
-            return await call_next(request)
-        
-        # Generate cache key
-        cache_key = self._generate_cache_key(request)
-        
-        # Try to get from cache
-        try:
-            cached_response = redis_client.get(cache_key)
-            if cached_response:
-                data = json.loads(cached_response)
-                return JSONResponse(
-                    content=data,
-                    headers={"X-Cache": "HIT"}
-                )
-        except Exception:
-            pass  # Cache miss or error, continue to origin
-        
-        # Get response from origin
-        response = await call_next(request)
-        
-        # Cache successful responses
-        if response.status_code == 200 and hasattr(response, 'body'):
-            try:
-                # Read response body
-                body = b""
-                async for chunk in response.body_iterator:
-                    body += chunk
-                
-                # Parse and cache
-                data = json.loads(body.decode())
-                redis_client.setex(
-                    cache_key, 
-                    self.cache_ttl, 
-                    json.dumps(data)
-                )
-                
-                # Return response with cache headers
-                return JSONResponse(
-                    content=data,
-                    status_code=response.status_code,
-                    headers={"X-Cache": "MISS"}
-                )
-            except Exception:
-                pass  # Don't cache on error
-        
-        return response
-    
-    def _generate_cache_key(self, request: Request) -> str:
-        """Generate cache key from request"""
-        key_data = f"{request.method}:{request.url.path}:{request.url.query}"
-        return f"cache:{hashlib.md5(key_data.encode()).hexdigest()}"
+settings = get_infra_settings()
 
 
 class PerformanceMiddleware(BaseHTTPMiddleware):
@@ -114,35 +39,82 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
         return response
 
 
+# Token bucket: refill for the time since the last call, then take one token.
+# KEYS[1]: bucket; ARGV[1]: capacity; ARGV[2]: refill rate in tokens per second.
+# Returns {allowed, tokens left, seconds until a token is available, seconds until full}
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+
+local until_full = (capacity - tokens) / rate
+-- A bucket that has refilled completely is the same as no bucket
+redis.call('PEXPIRE', KEYS[1], math.ceil(until_full * 1000) + 1000)
+return {allowed, math.floor(tokens), math.ceil(math.max(0, 1 - tokens) / rate), math.ceil(until_full)}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: int  # seconds until a request would be allowed
+    reset: int  # seconds until the full burst is available again
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Redis-based rate limiting middleware"""
+    """Redis-based rate limiting middleware
+
+    Each client has a token bucket holding up to burst requests, refilled at
+    requests_per_minute. The check runs as one Lua script, so it is atomic
+    and costs a single round trip.
+    """
     
     def __init__(self, app, requests_per_minute: int = 60, burst: int = 10):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
-        self.burst = burst
-        self.window_size = 60  # 1 minute
+        self.burst = max(burst, 1)
+        self._take_token = redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
     
     async def dispatch(self, request: Request, call_next):
         # Get client IP
         client_ip = self._get_client_ip(request)
         
         # Check rate limit
-        if not await self._check_rate_limit(client_ip):
+        result = await self._check_rate_limit(client_ip)
+        if result is None:
+            return await call_next(request)
+        
+        headers = {
+            "X-RateLimit-Limit": str(self.burst),
+            "X-RateLimit-Remaining": str(result.remaining),
+            "X-RateLimit-Reset": str(result.reset),
+        }
+        if not result.allowed:
             return JSONResponse(
                 status_code=429,
                 content={
                     "error": "Rate limit exceeded",
                     "message": f"Maximum {self.requests_per_minute} requests per minute allowed"
                 },
-                headers={
-                    "Retry-After": "60",
-                    "X-RateLimit-Limit": str(self.requests_per_minute),
-                    "X-RateLimit-Remaining": "0"
-                }
+                headers={"Retry-After": str(result.retry_after), **headers}
             )
         
-        return await call_next(request)
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
     
     def _get_client_ip(self, request: Request) -> str:
         """Get client IP from request"""
@@ -157,45 +129,17 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         return request.client.host if request.client else "unknown"
     
-    async def _check_rate_limit(self, client_ip: str) -> bool:
-        """Check if client is within rate limit"""
+    async def _check_rate_limit(self, client_ip: str) -> Optional[RateLimitResult]:
+        """Take a token from the client's bucket; None if Redis could not be reached"""
         try:
-            current_time = int(time.time())
-            key = f"rate_limit:{client_ip}:{current_time // self.window_size}"
-            
-            # Get current count
-            current_count = redis_client.get(key)
-            if current_count is None:
-                current_count = 0
-            else:
-                current_count = int(current_count)
-            
-            # Check limit
-            if current_count >= self.requests_per_minute:
-                return False
-            
-            # Increment counter
-            pipe = redis_client.pipeline()
-            pipe.incr(key)
-            pipe.expire(key, self.window_size)
-            pipe.execute()
-            
-            return True
+            allowed, remaining, retry_after, reset = await self._take_token(
+                keys=[f"rate_limit:{client_ip}"],
+                args=[self.burst, self.requests_per_minute / 60],
+            )
+            return RateLimitResult(bool(allowed), remaining, retry_after, reset)
         except Exception:
             # If Redis fails, allow request (fail open)
-            return True
-
-
-# Connection pooling for database
-from sqlalchemy.pool import QueuePool
-from app.core.database import engine
-
-# Configure connection pool
-engine.pool_class = QueuePool
-engine.pool_size = 20
-engine.max_overflow = 30
-engine.pool_pre_ping = True
-engine.pool_recycle = 3600
+            return None
 
 
 # Background task processor using Celery
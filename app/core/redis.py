@@ -0,0 +1,38 @@
+"""
+Shared async Redis connection pool.
+"""
+import redis.asyncio as redis
+from app.core.config import get_infra_settings
+
+settings = get_infra_settings()
+
+
+def _create_pool(decode_responses: bool) -> redis.BlockingConnectionPool:
+    # Callers wait up to redis_pool_timeout for a free connection instead of
+    # failing when all are in use.
+    return redis.BlockingConnectionPool.from_url(
+        settings.redis_url,
+        password=settings.redis_password,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_connect_timeout,
+        health_check_interval=settings.redis_health_check_interval,
+        decode_responses=decode_responses,
+    )
+
+
+# One pool per worker process
+redis_pool = _create_pool(decode_responses=True)
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+# Returns bytes, for values that are not text (cached response bodies)
+redis_binary_pool = _create_pool(decode_responses=False)
+redis_binary_client = redis.Redis(connection_pool=redis_binary_pool)
+
+
+async def close_redis():
+    """Close pooled Redis connections."""
+    for client, pool in ((redis_client, redis_pool), (redis_binary_client, redis_binary_pool)):
+        await client.aclose()
+        await pool.disconnect()
@@ -1,25 +1,52 @@
 """
 FastAPI application entry point.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.core.config import get_infra_settings
+from app.core.database import close_db
+from app.core.middleware import CacheMiddleware, QueryStatsMiddleware
+from app.core.cache import response_cache
+from app.core.redis import close_redis
+from app.services.agent_memory import agent_memory_buffer
 from app.routes.auth import router as auth_router
 from app.routes.contacts import router as contacts_router
 from app.routes.agent import router as agent_router
 from app.routes.monitoring import router as monitoring_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers, and drain them before the connections close."""
+    agent_memory_buffer.start()
+    response_cache.start()
+    yield
+    await response_cache.stop()
+    await agent_memory_buffer.stop()
+    await close_db()
+    await close_redis()
+
 # Create FastAPI app
 app = FastAPI(
     title="Opero API",
     description="AI-powered business automation platform - Streamline your operations with intelligent automation",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# Per-request SQL metrics; X-DB-* headers in debug mode
+app.add_middleware(QueryStatsMiddleware, debug=get_infra_settings().debug)
+
+# Response cache for the read-mostly endpoints listed in CacheMiddleware;
+# added before CORS so cached responses get CORS headers for each origin
+app.add_middleware(CacheMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -59,6 +86,11 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "version": "2.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics, scraped per worker."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/info")
 async def app_info():
     """Application info endpoint."""
@@ -0,0 +1,18 @@
+"""
+Agent memory model for persisting per-user conversation context.
+"""
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class AgentMemory(Base):
+    """Latest conversation context of one user, written by AgentMemoryBuffer."""
+    __tablename__ = "agent_memory"
+
+    user_id = Column(Integer, primary_key=True)
+    context = Column(JSONB, nullable=False, server_default="{}")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<AgentMemory(user_id={self.user_id})>"
@@ -3,13 +3,38 @@ Contact model for managing business contacts.
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import DDL, BigInteger, Column, Computed, Integer, String, DateTime, Boolean, Text, ForeignKey, Index, event, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+# Weighted full-text document: names rank above company, company above notes
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(first_name, '') || ' ' || coalesce(last_name, '')), 'A')"
+    " || setweight(to_tsvector('english', coalesce(company, '')), 'B')"
+    " || setweight(to_tsvector('english', coalesce(notes, '')), 'C')"
+)
+
+
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        Index("ix_contacts_user_active_id", "user_id", "is_active", "id"),
+        Index("ix_contacts_user_company", "user_id", "company"),
+        # pg_trgm indexes backing ILIKE '%q%' search
+        *(
+            Index(
+                f"ix_contacts_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+            for column in ("first_name", "last_name", "email", "company")
+        ),
+        Index("ix_contacts_search_vector", "search_vector", postgresql_using="gin"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -20,10 +45,74 @@ class Contact(Base):
     company = Column(String(200))
     position = Column(String(100))
     notes = Column(Text)
-    tags = Column(String(500))  # JSON array as string
+    tags = Column(String(500))  # comma-separated; indexed via contact_tags
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on every update
+    # Maintained by Postgres on every insert and update
+    search_vector = Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     def __repr__(self):
         return f"<Contact(id={self.id}, name={self.first_name} {self.last_name})>"
+
+
+class ContactTag(Base):
+    """One normalized (lowercased, trimmed) tag of a contact."""
+    __tablename__ = "contact_tags"
+    __table_args__ = (
+        Index("ix_contact_tags_tag_contact", "tag", "contact_id"),
+    )
+
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(500), primary_key=True)
+
+    def __repr__(self):
+        return f"<ContactTag(contact_id={self.contact_id}, tag={self.tag})>"
+
+
+
+class ContactChangeSeq(Base):
+    """Per-user counter bumped by every contact write, used for collection ETags."""
+    __tablename__ = "contact_change_seq"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    seq = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ContactChangeSeq(user_id={self.user_id}, seq={self.seq})>"
+
+
+# Migrate existing comma-separated tags when contact_tags is first created
+event.listen(
+    ContactTag.__table__,
+    "after_create",
+    DDL("""
+        INSERT INTO contact_tags (contact_id, tag)
+        SELECT DISTINCT c.id, lower(btrim(t.tag))
+        FROM contacts c
+        CROSS JOIN LATERAL unnest(string_to_array(c.tags, ',')) AS t(tag)
+        WHERE btrim(t.tag) <> ''
+        ON CONFLICT DO NOTHING
+    """).execute_if(dialect="postgresql"),
+)
+
+
+# create_all skips tables that already exist, with their indexes, so bring an
+# existing contacts table up to date after it runs
+CONTACTS_UPGRADE_DDL = [
+    "ALTER TABLE contacts ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE contacts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED",
+]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _upgrade_existing_tables(target, connection, **kw):
+    if connection.dialect.name != "postgresql":
+        return
+    for statement in CONTACTS_UPGRADE_DDL:
+        connection.execute(text(statement))
+    for table in (Contact.__table__, ContactTag.__table__):
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
@@ -12,7 +12,7 @@ router = APIRouter(prefix="/agent", tags=["AI Agent"])
 @router.post("/chat", response_model=AgentResponse)
 async def chat_with_agent(
     request: AgentRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db, scope="function")
 ):
     """Chat with the AI agent."""
     try:
@@ -78,7 +78,7 @@ async def demo_conversation():
 @router.post("/task", response_model=TaskResponse)
 async def execute_task(
     task: TaskRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db, scope="function")
 ):
     """Execute a specific business task."""
     try:
@@ -23,7 +23,7 @@ class UserLogin(BaseModel):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db, scope="function")
 ):
     """Login endpoint."""
     # For now, simple demo login
@@ -1,11 +1,29 @@
 """
 Contact management routes.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import json
+from functools import lru_cache
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
-from pydantic import BaseModel
-from typing import List, Optional
+from app.core.cache import contacts_cache_tag, etag_matches, purge_tags, tag_response
+from app.core.database import get_db, get_read_db
+from app.services.contact_dedup import DEFAULT_THRESHOLD, DedupIndex, MergeSuggestion
+from app.services.contact_export import gzip_stream, iter_csv, iter_ndjson
+from app.services.contact_import import iter_csv_rows, iter_ndjson_rows
+from app.services.contact_repository import (
+    CONTACT_FIELDS,
+    CONTACTS_BACKEND,
+    CONTACTS_USER_ID,
+    ContactRepository,
+    InMemoryContactRepository,
+    SqlContactRepository,
+)
+from app.services.contact_store import ContactStore, split_tags
+from pydantic import BaseModel, ValidationError, create_model
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 router = APIRouter(prefix="/contacts", tags=["Contacts"])
 
@@ -31,6 +49,9 @@ class ContactResponse(BaseModel):
     tags: Optional[str]
     is_active: bool
 
+class ContactSearchHit(ContactResponse):
+    rank: float
+
 class ContactUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -47,6 +68,30 @@ class ContactFilter(BaseModel):
     tags: Optional[str] = None
     is_active: Optional[bool] = True
 
+class ContactBatchDelete(BaseModel):
+    ids: Optional[List[int]] = None
+    filter: Optional[ContactFilter] = None
+
+class ContactBatchUpdate(ContactBatchDelete):
+    update: ContactUpdate
+
+class BatchItemResult(BaseModel):
+    id: int
+    status: str
+
+class BatchResult(BaseModel):
+    matched: int
+    results: List[BatchItemResult]
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+
 # Demo data
 demo_contacts = [
     {
@@ -75,16 +120,52 @@ demo_contacts = [
     }
 ]
 
-@router.get("/", response_model=List[ContactResponse])
-async def get_contacts(db: AsyncSession = Depends(get_db)):
-    """Get all contacts."""
-    return demo_contacts
+contact_store = ContactStore(demo_contacts)
+memory_repository = InMemoryContactRepository(contact_store)
 
-@router.post("/", response_model=ContactResponse)
-async def create_contact(contact: ContactCreate, db: AsyncSession = Depends(get_db)):
-    """Create a new contact."""
-    new_contact = {
-        "id": len(demo_contacts) + 1,
+
+def get_contact_repository(db: AsyncSession = Depends(get_db, scope="function")) -> ContactRepository:
+    """Get the contacts backend selected by CONTACTS_BACKEND."""
+    if CONTACTS_BACKEND == "postgres":
+        return SqlContactRepository(db)
+    return memory_repository
+
+
+def get_contact_reader(db: AsyncSession = Depends(get_read_db, scope="function")) -> ContactRepository:
+    """Like get_contact_repository, but on the read replica when one is healthy.
+
+    For read-only routes; results may trail the latest writes slightly.
+    """
+    if CONTACTS_BACKEND == "postgres":
+        return SqlContactRepository(db)
+    return memory_repository
+
+async def purge_contact_cache():
+    """Dependency for write routes: purge cached responses built from contacts.
+
+    Use it function-scoped, so the purge finishes before the response is
+    sent and a client cannot read its own write back from the cache. As a
+    route-level dependency it exits after get_db, so the purge follows the
+    commit and a concurrent read cannot re-cache the old rows.
+    Runs even when the route fails, since a failed import or batch may
+    still have written some contacts.
+    """
+    try:
+        yield
+    finally:
+        await purge_tags(contacts_cache_tag(CONTACTS_USER_ID))
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ERRORS = 1000  # failures beyond this are counted but not itemized
+EXPORT_BATCH_SIZE = 1000
+MAX_BATCH_IDS = 10000
+
+
+def _new_contact(contact: ContactCreate) -> Dict[str, Any]:
+    """Build a contact record from validated input."""
+    return {
         "first_name": contact.first_name,
         "last_name": contact.last_name,
         "email": contact.email,
@@ -95,93 +176,370 @@ async def create_contact(contact: ContactCreate, db: AsyncSession = Depends(get_
         "tags": contact.tags,
         "is_active": True
     }
-    demo_contacts.append(new_contact)
-    return new_contact
+
+
+def _encode_cursor(contact_id: int, **position: Any) -> str:
+    """Encode the keyset position of a page as an opaque cursor."""
+    payload = json.dumps({"id": contact_id, **position}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _load_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Decode a cursor into the id to continue after."""
+    if not cursor:
+        return None
+    try:
+        return int(_load_cursor(cursor)["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _decode_rank_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    """Decode a ranked-search cursor into the (rank, id) to continue after."""
+    if not cursor:
+        return None
+    position = _load_cursor(cursor)
+    try:
+        return float(position["rank"]), int(position["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a fields= projection; id is always included."""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in CONTACT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+@lru_cache(maxsize=128)
+def _projection_model(fields: Tuple[str, ...]):
+    """Build (once per field set) a ContactResponse reduced to fields."""
+    return create_model(
+        "ContactProjection",
+        **{field: (ContactResponse.__annotations__[field], ...) for field in fields}
+    )
+
+
+def _projected(content: Any, fields: Tuple[str, ...], response: Response) -> JSONResponse:
+    """Serialize projected records through the reduced model, keeping response headers."""
+    model = _projection_model(fields)
+    if isinstance(content, list):
+        body = [model(**record).dict() for record in content]
+    else:
+        body = model(**content).dict()
+    return JSONResponse(content=body, headers=dict(response.headers))
+
+
+def _batch_target(batch: ContactBatchDelete) -> Tuple[Optional[List[int]], Dict[str, Any]]:
+    """Turn a batch request's ids and filter into repository arguments."""
+    if batch.ids is None and batch.filter is None:
+        raise HTTPException(status_code=400, detail="Provide ids, a filter, or both")
+    if batch.ids is not None and len(batch.ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per batch")
+
+    criteria: Dict[str, Any] = {}
+    if batch.filter is not None:
+        criteria = {
+            "company": batch.filter.company,
+            "tags": split_tags(batch.filter.tags),
+            "is_active": batch.filter.is_active,
+        }
+    return batch.ids, criteria
+
+
+def _batch_result(ids: Optional[List[int]], matched: List[int], status: str) -> BatchResult:
+    """Report status per matched id, and not_found for requested ids that were not."""
+    results = [BatchItemResult(id=contact_id, status=status) for contact_id in matched]
+    if ids is not None:
+        matched_ids = set(matched)
+        results.extend(
+            BatchItemResult(id=contact_id, status="not_found")
+            for contact_id in dict.fromkeys(ids) if contact_id not in matched_ids
+        )
+    return BatchResult(matched=len(matched), results=results)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _paginate(
+    response: Response, records: List[Dict[str, Any]], limit: int, *keys: str
+) -> List[Dict[str, Any]]:
+    """Trim a limit + 1 fetch to limit and set X-Next-Cursor if more remain.
+
+    keys are sort fields other than id that the cursor must carry.
+    """
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last["id"], **{key: last[key] for key in keys})
+    return records
+
+@router.get("/", response_model=List[ContactResponse])
+async def get_contacts(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    contacts: ContactRepository = Depends(get_contact_reader)
+):
+    """Get contacts in id order, one page at a time.
+
+    Pass the X-Next-Cursor header of a response as cursor to get the next page.
+    fields is an optional comma-separated list of fields to return.
+    """
+    after_id = _decode_cursor(cursor)
+    projection = _parse_fields(fields)
+    etag = f'"contacts-{await contacts.change_seq()}"'
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+
+    records = await contacts.page(after_id=after_id, limit=limit + 1, fields=projection)
+    records = _paginate(response, records, limit)
+    return records if projection is None else _projected(records, projection, response)
+
+@router.post("/", response_model=ContactResponse, dependencies=[Depends(purge_contact_cache, scope="function")])
+async def create_contact(contact: ContactCreate, contacts: ContactRepository = Depends(get_contact_repository)):
+    """Create a new contact."""
+    return await contacts.create(_new_contact(contact))
+
+@router.post("/import", response_model=ImportReport, dependencies=[Depends(purge_contact_cache, scope="function")])
+async def import_contacts(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    batch_size: int = Query(DEFAULT_IMPORT_BATCH_SIZE, ge=1, le=50000),
+    contacts: ContactRepository = Depends(get_contact_repository)
+):
+    """Bulk import contacts from a streamed CSV or NDJSON body.
+
+    The body is parsed as it arrives and each row is validated as a
+    ContactCreate. Valid rows are written in batches of batch_size; invalid
+    rows are skipped and reported by row number. The format defaults to CSV
+    for text/csv bodies and NDJSON otherwise.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parse = iter_csv_rows if format == "csv" else iter_ndjson_rows
+
+    report = ImportReport()
+    batch: List[Dict[str, Any]] = []
+    async for row_number, row, error in parse(request.stream()):
+        if error is None:
+            try:
+                batch.append(_new_contact(ContactCreate(**row)))
+            except ValidationError as e:
+                error = "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+                )
+        if error is not None:
+            report.failed += 1
+            if len(report.errors) < MAX_IMPORT_ERRORS:
+                report.errors.append(ImportRowError(row=row_number, error=error))
+
+        if len(batch) >= batch_size:
+            report.imported += await contacts.create_many(batch)
+            batch = []
+
+    if batch:
+        report.imported += await contacts.create_many(batch)
+    return report
+
+@router.get("/export")
+async def export_contacts(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    contacts: ContactRepository = Depends(get_contact_reader)
+):
+    """Stream every contact as CSV or NDJSON, optionally gzip-encoded.
+
+    Rows are read and encoded in batches as the response is sent, so memory
+    use does not grow with the number of contacts.
+    """
+    encode = iter_csv if format == "csv" else iter_ndjson
+    body = encode(contacts.iter_batches(EXPORT_BATCH_SIZE))
+    headers = {"Content-Disposition": f'attachment; filename="contacts.{format}"'}
+    if gzip:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
 
 @router.get("/{contact_id}", response_model=ContactResponse)
-async def get_contact(contact_id: int, db: AsyncSession = Depends(get_db)):
-    """Get a specific contact."""
-    contact = next((c for c in demo_contacts if c["id"] == contact_id), None)
-    if not contact:
+async def get_contact(
+    contact_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    contacts: ContactRepository = Depends(get_contact_reader)
+):
+    """Get a specific contact, optionally only the given fields."""
+    projection = _parse_fields(fields)
+    found = await contacts.get_versioned(contact_id, fields=projection)
+    if found is None:
         raise HTTPException(status_code=404, detail="Contact not found")
-    return contact
+    version, contact = found
+    etag = f'"contact-{contact_id}-{version}"'
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    return contact if projection is None else _projected(contact, projection, response)
 
-@router.put("/{contact_id}", response_model=ContactResponse)
+@router.put("/{contact_id}", response_model=ContactResponse, dependencies=[Depends(purge_contact_cache, scope="function")])
 async def update_contact(
     contact_id: int, 
     contact_update: ContactUpdate, 
-    db: AsyncSession = Depends(get_db)
+    contacts: ContactRepository = Depends(get_contact_repository)
 ):
     """Update a contact."""
-    contact = next((c for c in demo_contacts if c["id"] == contact_id), None)
-    if not contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    
     # Update only provided fields
     update_data = contact_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        contact[field] = value
+    contact = await contacts.update(contact_id, update_data)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
     
     return contact
 
-@router.delete("/{contact_id}")
-async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db)):
+@router.delete("/{contact_id}", dependencies=[Depends(purge_contact_cache, scope="function")])
+async def delete_contact(contact_id: int, contacts: ContactRepository = Depends(get_contact_repository)):
     """Delete a contact."""
-    contact_index = next((i for i, c in enumerate(demo_contacts) if c["id"] == contact_id), None)
-    if contact_index is None:
+    if not await contacts.delete(contact_id):
         raise HTTPException(status_code=404, detail="Contact not found")
     
-    demo_contacts.pop(contact_index)
     return {"message": "Contact deleted successfully"}
 
+@router.patch("/batch", response_model=BatchResult, dependencies=[Depends(purge_contact_cache, scope="function")])
+async def batch_update_contacts(
+    batch: ContactBatchUpdate,
+    contacts: ContactRepository = Depends(get_contact_repository)
+):
+    """Apply one update to many contacts, selected by ids and/or a filter.
+
+    The filter matches an exact company, all of its comma-separated tags and
+    is_active. Only fields set in update are changed, as with PUT.
+    """
+    ids, criteria = _batch_target(batch)
+    update_data = batch.update.dict(exclude_unset=True)
+    matched = await contacts.update_many(ids, criteria, update_data)
+    return _batch_result(ids, matched, "updated")
+
+@router.post("/batch-delete", response_model=BatchResult, dependencies=[Depends(purge_contact_cache, scope="function")])
+async def batch_delete_contacts(
+    batch: ContactBatchDelete,
+    contacts: ContactRepository = Depends(get_contact_repository)
+):
+    """Delete many contacts, selected like the batch update."""
+    ids, criteria = _batch_target(batch)
+    matched = await contacts.delete_many(ids, criteria)
+    return _batch_result(ids, matched, "deleted")
+
+@router.get("/dedup/suggestions", response_model=List[MergeSuggestion])
+async def get_dedup_suggestions(
+    threshold: float = Query(DEFAULT_THRESHOLD, ge=0, le=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    contacts: ContactRepository = Depends(get_contact_reader)
+):
+    """Suggest likely duplicate contacts to merge, best matches first.
+
+    Contacts are blocked by normalized email and by phonetic name plus
+    company; only pairs sharing a block are scored.
+    """
+    # Indexing and scoring are CPU-bound; keep them off the event loop
+    index = DedupIndex()
+    async for batch in contacts.iter_batches(EXPORT_BATCH_SIZE):
+        await run_in_threadpool(index.add_many, batch)
+    suggestions = await run_in_threadpool(index.suggestions, threshold)
+    return suggestions[:limit]
+
 @router.get("/search/", response_model=List[ContactResponse])
 async def search_contacts(
+    request: Request,
+    response: Response,
     q: Optional[str] = None,
     company: Optional[str] = None,
     tags: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    tag_match: Literal["all", "any"] = "all",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    contacts: ContactRepository = Depends(get_contact_reader)
 ):
-    """Search contacts by name, company, or tags."""
-    filtered_contacts = demo_contacts.copy()
-    
-    if q:
-        q_lower = q.lower()
-        filtered_contacts = [
-            c for c in filtered_contacts
-            if (q_lower in c["first_name"].lower() or
-                (c["last_name"] and q_lower in c["last_name"].lower()) or
-                (c["email"] and q_lower in c["email"].lower()) or
-                (c["company"] and q_lower in c["company"].lower()))
-        ]
-    
-    if company:
-        filtered_contacts = [
-            c for c in filtered_contacts
-            if c["company"] and company.lower() in c["company"].lower()
-        ]
-    
-    if tags:
-        filtered_contacts = [
-            c for c in filtered_contacts
-            if c["tags"] and tags.lower() in c["tags"].lower()
-        ]
-    
-    return filtered_contacts
+    """Search contacts by name, company, or tags, paginated like the listing.
+
+    tags is a comma-separated list of exact tags (case-insensitive);
+    tag_match selects whether a contact needs all of them or any.
+    """
+    after_id = _decode_cursor(cursor)
+    projection = _parse_fields(fields)
+    etag = f'"contacts-{await contacts.change_seq()}"'
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+
+    records = await contacts.search(
+        q=q,
+        company=company,
+        tags=split_tags(tags),
+        tag_match=tag_match,
+        after_id=after_id,
+        limit=limit + 1,
+        fields=projection,
+    )
+    records = _paginate(response, records, limit)
+    return records if projection is None else _projected(records, projection, response)
+
+@router.get("/search/fulltext", response_model=List[ContactSearchHit])
+async def fulltext_search_contacts(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    contacts: ContactRepository = Depends(get_contact_reader)
+):
+    """Full-text search over contact names, company and notes, best match first.
+
+    Words in q are stemmed and all must match; names weigh more than
+    company, and company more than notes. Paginated with X-Next-Cursor.
+    """
+    after = _decode_rank_cursor(cursor)
+    etag = f'"contacts-{await contacts.change_seq()}"'
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+
+    records = await contacts.fulltext(q, after=after, limit=limit + 1)
+    return _paginate(response, records, limit, "rank")
 
 @router.get("/stats/overview")
-async def get_contact_stats(db: AsyncSession = Depends(get_db)):
+async def get_contact_stats(
+    request: Request,
+    response: Response,
+    contacts: ContactRepository = Depends(get_contact_reader)
+):
     """Get contact statistics and overview."""
-    total_contacts = len(demo_contacts)
-    active_contacts = len([c for c in demo_contacts if c["is_active"]])
-    companies = len(set(c["company"] for c in demo_contacts if c["company"]))
-    
-    return {
-        "total_contacts": total_contacts,
-        "active_contacts": active_contacts,
-        "inactive_contacts": total_contacts - active_contacts,
-        "unique_companies": companies,
-        "contacts_by_company": {
-            c["company"]: len([contact for contact in demo_contacts if contact["company"] == c["company"]])
-            for c in demo_contacts if c["company"]
-        }
-    }
+    tag_response(request, contacts_cache_tag(CONTACTS_USER_ID))
+    etag = f'"contact-stats-{await contacts.change_seq()}"'
+    if etag_matches(request, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    return await contacts.stats()
@@ -7,8 +7,8 @@ import asyncio
 from typing import Dict, Any
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
-from app.core.database import get_db
-from app.core.performance import redis_client
+from app.core.database import AsyncSessionLocal
+from app.core.redis import redis_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,7 +33,7 @@ async def health_check():
     # Check database
     try:
         start_time = time.time()
-        async with get_db() as db:
+        async with AsyncSessionLocal() as db:
             await db.execute(text("SELECT 1"))
         db_response_time = time.time() - start_time
         
@@ -51,7 +51,7 @@ async def health_check():
     # Check Redis
     try:
         start_time = time.time()
-        redis_client.ping()
+        await redis_client.ping()
         redis_response_time = time.time() - start_time
         
         health_status["checks"]["redis"] = {
@@ -145,7 +145,7 @@ async def application_metrics():
 async def _get_database_metrics() -> Dict[str, Any]:
     """Get database performance metrics"""
     try:
-        async with get_db() as db:
+        async with AsyncSessionLocal() as db:
             # Connection count
             result = await db.execute(text("""
                 SELECT count(*) as connection_count 
@@ -175,7 +175,7 @@ async def _get_database_metrics() -> Dict[str, Any]:
 async def _get_redis_metrics() -> Dict[str, Any]:
     """Get Redis performance metrics"""
     try:
-        info = redis_client.info()
+        info = await redis_client.info()
         return {
             "connected_clients": info.get("connected_clients", 0),
             "used_memory": info.get("used_memory", 0),
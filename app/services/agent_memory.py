@@ -0,0 +1,129 @@
+"""
+Write-behind persistence of agent conversation context.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_infra_settings
+from app.core.database import AsyncSessionLocal
+from app.models.agent_memory import AgentMemory
+
+logger = logging.getLogger(__name__)
+
+
+class AgentMemoryBuffer:
+    """Buffers context updates in memory and writes them to agent_memory in batches.
+
+    submit() returns immediately. Updates for the same user are merged
+    (later keys win), and the pending set is flushed every flush_interval
+    seconds, or as soon as max_pending users are waiting. A failed flush
+    puts its updates back to be retried, and stop() flushes what is left.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        flush_interval: float = 2.0,
+        max_pending: int = 500,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, user_id: int, context: Dict[str, Any]):
+        """Queue a context update for user_id."""
+        self._pending.setdefault(user_id, {}).update(context)
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def load(self, user_id: int) -> Dict[str, Any]:
+        """Get the stored context of user_id with any unflushed updates applied."""
+        async with self.session_factory() as session:
+            stored = await session.scalar(select(AgentMemory.context).where(AgentMemory.user_id == user_id))
+        return {**(stored or {}), **self._pending.get(user_id, {})}
+
+    async def flush(self) -> int:
+        """Write all pending updates in one statement; return how many users were written."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                await self._write(batch)
+            except BaseException:
+                # Also on cancellation, so stop() can retry the batch.
+                # Updates submitted meanwhile are newer, so they win the merge
+                for user_id, context in self._pending.items():
+                    batch.setdefault(user_id, {}).update(context)
+                self._pending = batch
+                raise
+            return len(batch)
+
+    async def _write(self, batch: Dict[int, Dict[str, Any]]):
+        statement = pg_insert(AgentMemory).values([
+            {"user_id": user_id, "context": context} for user_id, context in batch.items()
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=[AgentMemory.user_id],
+            # jsonb || merges the new keys over the stored ones
+            set_={
+                "context": AgentMemory.context.op("||")(statement.excluded.context),
+                "updated_at": func.now(),
+            },
+        )
+        async with self.session_factory() as session:
+            await session.execute(statement)
+            await session.commit()
+
+    def start(self):
+        """Start the background flush loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write everything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final agent memory flush failed; %d users' context not saved", self.pending)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Agent memory flush failed; %d users pending", self.pending)
+
+
+settings = get_infra_settings()
+
+# Global buffer, started and stopped with the application
+agent_memory_buffer = AgentMemoryBuffer(
+    flush_interval=settings.agent_memory_flush_interval,
+    max_pending=settings.agent_memory_flush_size,
+)
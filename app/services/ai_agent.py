@@ -3,9 +3,13 @@ AI Agent service for processing and responding to user requests.
 """
 import json
 import asyncio
+import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from pydantic import BaseModel
+from app.services.agent_memory import agent_memory_buffer
+
+logger = logging.getLogger(__name__)
 
 class AgentRequest(BaseModel):
     user_id: int
@@ -34,7 +38,7 @@ class AIAgentService:
     """Core AI Agent service for processing user requests."""
     
     def __init__(self):
-        self.memory = {}  # Simple in-memory storage
+        self.memory = {}  # Per-process cache; agent_memory_buffer persists it
         self.capabilities = [
             "contact_management",
             "email_automation", 
@@ -127,13 +131,24 @@ class AIAgentService:
     
     async def get_user_context(self, user_id: int) -> Dict[str, Any]:
         """Get user context and conversation history."""
-        return self.memory.get(user_id, {})
+        if user_id not in self.memory:
+            try:
+                self.memory[user_id] = await agent_memory_buffer.load(user_id)
+            except Exception:
+                logger.exception("Could not load agent memory for user %s", user_id)
+                return {}
+        return self.memory[user_id]
     
     async def update_user_context(self, user_id: int, context: Dict[str, Any]):
-        """Update user context in memory."""
-        if user_id not in self.memory:
-            self.memory[user_id] = {}
-        self.memory[user_id].update(context)
+        """Update user context in memory and queue it for persistence.
+
+        Returns without waiting for the write; agent_memory_buffer writes
+        the update in its next batch. A user this worker has not cached yet
+        is left to get_user_context, whose load includes pending updates.
+        """
+        if user_id in self.memory:
+            self.memory[user_id].update(context)
+        agent_memory_buffer.submit(user_id, context)
     
     async def execute_task(self, request: TaskRequest) -> TaskResponse:
         """Execute a specific business task."""
@@ -0,0 +1,175 @@
+"""
+Duplicate contact detection using blocking keys and string similarity.
+"""
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from pydantic import BaseModel
+
+# Blocks up to this size are compared all-pairs; larger ones only compare
+# each contact with its neighbours in name order (sorted neighbourhood).
+MAX_BLOCK_SIZE = 50
+NEIGHBOURHOOD_WINDOW = 10
+
+DEFAULT_THRESHOLD = 0.75
+
+_SOUNDEX_CODES = {
+    letter: digit
+    for digit, letters in {"1": "bfpv", "2": "cgjkqsxz", "3": "dt", "4": "l", "5": "mn", "6": "r"}.items()
+    for letter in letters
+}
+_COMPANY_SUFFIXES = {"inc", "llc", "ltd", "corp", "corporation", "co", "company", "gmbh", "plc"}
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+class MergeSuggestion(BaseModel):
+    primary_id: int
+    duplicate_id: int
+    score: float
+    reasons: List[str]
+
+
+class _Entry(NamedTuple):
+    id: int
+    name: str
+    company: str
+    email: str
+
+
+def soundex(name: str) -> str:
+    """American Soundex code of a name ("" if it has no letters)."""
+    letters = [c for c in name.lower() if "a" <= c <= "z"]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def normalize_email(email: str) -> str:
+    """Lowercase an email and drop any +suffix from the local part."""
+    local, _, domain = email.strip().lower().partition("@")
+    return f"{local.split('+', 1)[0]}@{domain}" if domain else local
+
+
+def normalize_company(company: str) -> str:
+    """Lowercase a company name, dropping punctuation and legal suffixes."""
+    words = _NON_ALNUM.sub(" ", company.lower()).split()
+    return " ".join(word for word in words if word not in _COMPANY_SUFFIXES)
+
+
+def _similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class DedupIndex:
+    """Collects contacts into blocks and scores candidate pairs within them.
+
+    Contacts share a block when they have the same normalized email, or
+    the same first initial and Soundex last name at the same normalized
+    company.
+    Only pairs within a block are scored, so the work grows with the number
+    of contacts rather than its square.
+    """
+
+    def __init__(self, max_block_size: int = MAX_BLOCK_SIZE, window: int = NEIGHBOURHOOD_WINDOW):
+        self.max_block_size = max_block_size
+        self.window = window
+        self._entries: Dict[int, _Entry] = {}
+        self._blocks: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, contact: Dict[str, Any]):
+        """Add a contact record to the index."""
+        first = (contact.get("first_name") or "").strip()
+        last = (contact.get("last_name") or "").strip()
+        entry = _Entry(
+            id=contact["id"],
+            name=f"{first} {last}".strip().lower(),
+            company=normalize_company(contact.get("company") or ""),
+            email=normalize_email(contact.get("email") or ""),
+        )
+        self._entries[entry.id] = entry
+
+        if entry.email:
+            self._blocks[("email", entry.email)].append(entry.id)
+        if first or last:
+            # First initial rather than the full first name's code, so that
+            # truncated first names ("Joh" for "John") still share a block
+            name_key = f"{first[:1].lower()}{soundex(last)}" if last else soundex(first)
+            self._blocks[("name", f"{name_key}|{entry.company}")].append(entry.id)
+
+    def add_many(self, contacts: Iterable[Dict[str, Any]]):
+        for contact in contacts:
+            self.add(contact)
+
+    def candidate_pairs(self) -> Set[Tuple[int, int]]:
+        """Get the (lower id, higher id) pairs that share at least one block."""
+        pairs: Set[Tuple[int, int]] = set()
+        for ids in self._blocks.values():
+            if len(ids) < 2:
+                continue
+            if len(ids) <= self.max_block_size:
+                window = len(ids)
+            else:
+                window = self.window
+                ids = sorted(ids, key=lambda contact_id: self._entries[contact_id].name)
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:i + 1 + window]:
+                    pairs.add((a, b) if a < b else (b, a))
+        return pairs
+
+    def score(self, a: int, b: int) -> Tuple[float, List[str]]:
+        """Score how likely two contacts are the same person, from 0 to 1."""
+        first, second = self._entries[a], self._entries[b]
+        reasons = []
+
+        name_score = _similarity(first.name, second.name)
+        if name_score >= 0.8:
+            reasons.append("similar_name")
+
+        if first.company and second.company:
+            company_score = _similarity(first.company, second.company)
+            if company_score >= 0.9:
+                reasons.append("same_company")
+        else:
+            company_score = 0.5
+
+        if first.email and first.email == second.email:
+            # A shared mailbox is close to conclusive on its own
+            reasons.append("same_email")
+            score = 0.6 + 0.4 * name_score
+        elif first.email and second.email:
+            # People keep several addresses, so different ones are only weak
+            # evidence against; near-identical ones (jon.doe@/john.doe@) are neutral
+            email_similarity = _similarity(first.email, second.email)
+            if email_similarity >= 0.9:
+                reasons.append("similar_email")
+            score = 0.45 * name_score + 0.2 * company_score + 0.35 * 0.5 * email_similarity
+        else:
+            score = 0.45 * name_score + 0.2 * company_score + 0.35 * 0.5
+        return round(score, 4), reasons
+
+    def suggestions(self, threshold: float = DEFAULT_THRESHOLD) -> List[MergeSuggestion]:
+        """Score every candidate pair and return those at or above threshold, best first."""
+        suggestions = []
+        for a, b in self.candidate_pairs():
+            score, reasons = self.score(a, b)
+            if score >= threshold:
+                suggestions.append(MergeSuggestion(primary_id=a, duplicate_id=b, score=score, reasons=reasons))
+        suggestions.sort(key=lambda s: (-s.score, s.primary_id, s.duplicate_id))
+        return suggestions
@@ -0,0 +1,50 @@
+"""
+Streaming CSV / NDJSON encoders for contact exports.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+EXPORT_FIELDS = (
+    "id", "first_name", "last_name", "email", "phone",
+    "company", "position", "notes", "tags", "is_active",
+)
+
+Batches = AsyncIterator[List[Dict[str, Any]]]
+
+
+async def iter_csv(batches: Batches, fields: Sequence[str] = EXPORT_FIELDS) -> AsyncIterator[bytes]:
+    """Encode record batches as CSV, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for batch in batches:
+        writer.writerows([record.get(field) for field in fields] for record in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def iter_ndjson(batches: Batches, fields: Sequence[str] = EXPORT_FIELDS) -> AsyncIterator[bytes]:
+    """Encode record batches as newline-delimited JSON, one chunk per batch."""
+    async for batch in batches:
+        lines = [
+            json.dumps({field: record.get(field) for field in fields}, default=str)
+            for record in batch
+        ]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Gzip a byte stream on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,104 @@
+"""
+In-memory ranked full-text index, the fallback for Postgres tsvector search.
+"""
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.contact_search import intersect
+
+# Field weights, mirroring setweight() A / B / C in the Postgres index
+FIELD_WEIGHTS = (
+    ("first_name", 1.0),
+    ("last_name", 1.0),
+    ("company", 0.4),
+    ("notes", 0.2),
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "was", "with",
+}
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def _stem(word: str) -> str:
+    """Strip a common English suffix; crude, but applied to documents and queries alike."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split into words, drop stopwords and stem."""
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+class FullTextIndex:
+    """Weighted inverted index over contact names, company and notes.
+
+    A query matches records containing every query term. Like ts_rank,
+    matches are ranked by weighted term frequency alone, so a record's rank
+    does not move as other records change and page cursors stay valid.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+    def add(self, record_id: int, record: Dict[str, Any]):
+        """Index a record's text fields."""
+        for term, weight in self._weighted_terms(record).items():
+            self._postings[term][record_id] = weight
+
+    def remove(self, record_id: int, record: Dict[str, Any]):
+        """Drop a record's text fields from the index."""
+        for term in self._weighted_terms(record):
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(record_id, None)
+            if not docs:
+                del self._postings[term]
+
+    def search(
+        self,
+        query: str,
+        after: Optional[Tuple[float, int]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Get (id, rank) pairs by descending rank, then id.
+
+        after is the (rank, id) of the last result of the previous page.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+
+        matches: Set[int] = intersect(*(set(docs) for docs in postings))
+        ranked = [
+            (record_id, round(sum(docs[record_id] for docs in postings), 6))
+            for record_id in matches
+        ]
+        if after is not None:
+            after_rank, after_id = after
+            ranked = [
+                (record_id, rank) for record_id, rank in ranked
+                if rank < after_rank or (rank == after_rank and record_id > after_id)
+            ]
+        ranked.sort(key=lambda hit: (-hit[1], hit[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+    @staticmethod
+    def _weighted_terms(record: Dict[str, Any]) -> Counter:
+        weights: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            value = record.get(field)
+            if value:
+                for term in tokenize(value):
+                    weights[term] += weight
+        return weights
@@ -0,0 +1,85 @@
+"""
+Incremental CSV / NDJSON parsing for streamed contact imports.
+"""
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+# (row number, parsed row, parse error)
+ImportRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream into lines, keeping line endings."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """Parse a CSV stream with a header row into dicts.
+
+    Lines are grouped into records by quote parity, so quoted fields may
+    span lines. Empty cells become None.
+    """
+    header = None
+    row_number = 0
+    pending = []
+    quotes = 0
+
+    async for line in iter_lines(chunks):
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+
+        record = "".join(pending)
+        pending = []
+        quotes = 0
+        try:
+            values = next(csv.reader([record]), None)
+        except csv.Error as e:
+            row_number += 1
+            yield row_number, None, f"Malformed CSV: {e}"
+            continue
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, {name: value or None for name, value in zip(header, values)}, None
+
+    if pending:
+        row_number += 1
+        yield row_number, None, "Unterminated quoted field"
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """Parse a newline-delimited JSON stream, one object per line."""
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, row, None
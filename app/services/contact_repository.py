@@ -0,0 +1,443 @@
+"""
+Contact repositories: the in-memory store and Postgres behind one interface.
+"""
+import os
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.contact import Contact, ContactChangeSeq, ContactTag
+from app.services.contact_store import ContactStore, split_tags
+
+# "memory" (default) or "postgres"
+CONTACTS_BACKEND = os.getenv("CONTACTS_BACKEND", "memory")
+# Contact routes are not tied to an authenticated user yet, so every
+# contact is stored under this owner.
+CONTACTS_USER_ID = int(os.getenv("CONTACTS_USER_ID", "1"))
+
+CONTACT_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone,
+    Contact.company,
+    Contact.position,
+    Contact.notes,
+    Contact.tags,
+    Contact.is_active,
+)
+CONTACT_FIELDS = tuple(column.key for column in CONTACT_COLUMNS)
+
+
+class ContactRepository(ABC):
+    """Storage operations used by the contact routes.
+
+    Records are plain dicts with the ContactResponse fields, or only the
+    requested ones when a read takes fields. Pages and search results are
+    ordered by id and start after after_id.
+    """
+
+    @abstractmethod
+    async def get(self, contact_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get a contact by id."""
+
+    @abstractmethod
+    async def create(self, contact: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a contact and return it with its id."""
+
+    @abstractmethod
+    async def create_many(self, contacts: List[Dict[str, Any]]) -> int:
+        """Create a batch of contacts and return how many were written."""
+
+    @abstractmethod
+    async def update(self, contact_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply field changes to a contact."""
+
+    @abstractmethod
+    async def delete(self, contact_id: int) -> bool:
+        """Delete a contact; return whether it existed."""
+
+    @abstractmethod
+    async def update_many(
+        self, ids: Optional[List[int]], criteria: Dict[str, Any], changes: Dict[str, Any]
+    ) -> List[int]:
+        """Apply the same changes to every matching contact; return updated ids.
+
+        Contacts match if their id is in ids (when given) and they satisfy
+        criteria: an exact company, all of a list of tags, and is_active.
+        """
+
+    @abstractmethod
+    async def delete_many(self, ids: Optional[List[int]], criteria: Dict[str, Any]) -> List[int]:
+        """Delete every matching contact, as for update_many; return deleted ids."""
+
+    @abstractmethod
+    async def page(
+        self, after_id: Optional[int], limit: int, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of contacts in id order."""
+
+    @abstractmethod
+    async def search(
+        self,
+        q: Optional[str],
+        company: Optional[str],
+        tags: Optional[List[str]],
+        tag_match: str,
+        after_id: Optional[int],
+        limit: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search contacts, paginated like page().
+
+        q and company are case-insensitive substrings; tags are exact
+        normalized tags, all or any of which must match per tag_match.
+        """
+
+    @abstractmethod
+    async def fulltext(
+        self, query: str, after: Optional[Tuple[float, int]], limit: int
+    ) -> List[Dict[str, Any]]:
+        """Full-text search over names, company and notes.
+
+        Records carry an extra rank and are ordered by descending rank, then
+        id; after is the (rank, id) of the last record of the previous page.
+        """
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Get contact counts for the overview endpoint."""
+
+    @abstractmethod
+    async def get_versioned(
+        self, contact_id: int, fields: Optional[Sequence[str]] = None
+    ) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Get a contact by id with its version, bumped on every update; None if missing."""
+
+    @abstractmethod
+    async def change_seq(self) -> int:
+        """Get the collection change sequence, bumped on every write."""
+
+    @abstractmethod
+    def iter_batches(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield every contact in id order, batch_size records at a time."""
+
+
+def _project(record: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: record.get(field) for field in fields}
+
+
+class InMemoryContactRepository(ContactRepository):
+    """Repository backed by a process-local ContactStore."""
+
+    def __init__(self, store: ContactStore):
+        self.store = store
+
+    async def get(self, contact_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        contact = self.store.get(contact_id)
+        if contact is None or fields is None:
+            return contact
+        return _project(contact, fields)
+
+    async def create(self, contact: Dict[str, Any]) -> Dict[str, Any]:
+        return self.store.add(contact)
+
+    async def create_many(self, contacts: List[Dict[str, Any]]) -> int:
+        return len(self.store.add_many(contacts))
+
+    async def update(self, contact_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self.store.update(contact_id, changes)
+
+    async def delete(self, contact_id: int) -> bool:
+        return self.store.delete(contact_id) is not None
+
+    async def update_many(self, ids, criteria, changes) -> List[int]:
+        matched = self.store.select_ids(ids=ids, **criteria)
+        for contact_id in matched:
+            self.store.update(contact_id, changes)
+        return matched
+
+    async def delete_many(self, ids, criteria) -> List[int]:
+        matched = self.store.select_ids(ids=ids, **criteria)
+        for contact_id in matched:
+            self.store.delete(contact_id)
+        return matched
+
+    async def page(self, after_id, limit, fields=None) -> List[Dict[str, Any]]:
+        records = self.store.page(after_id=after_id, limit=limit)
+        return records if fields is None else [_project(record, fields) for record in records]
+
+    async def search(self, q, company, tags, tag_match, after_id, limit, fields=None) -> List[Dict[str, Any]]:
+        records = self.store.search(
+            q=q, company=company, tags=tags, tag_match=tag_match, after_id=after_id, limit=limit
+        )
+        return records if fields is None else [_project(record, fields) for record in records]
+
+    async def fulltext(self, query, after, limit) -> List[Dict[str, Any]]:
+        return self.store.fulltext(query, after=after, limit=limit)
+
+    async def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+    async def get_versioned(self, contact_id, fields=None) -> Optional[Tuple[int, Dict[str, Any]]]:
+        contact = self.store.get(contact_id)
+        if contact is None:
+            return None
+        return contact["version"], contact if fields is None else _project(contact, fields)
+
+    async def change_seq(self) -> int:
+        return self.store.change_seq
+
+    async def iter_batches(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        after_id = None
+        while True:
+            batch = self.store.page(after_id=after_id, limit=batch_size)
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1]["id"]
+
+
+def _like_pattern(value: str) -> str:
+    """Build an ILIKE substring pattern with wildcards in value escaped."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SqlContactRepository(ContactRepository):
+    """Repository backed by the contacts table, scoped to one owner."""
+
+    def __init__(self, session: AsyncSession, user_id: int = CONTACTS_USER_ID):
+        self.session = session
+        self.user_id = user_id
+
+    def _select(self, fields: Optional[Sequence[str]] = None):
+        # Only the requested columns are read, so unrequested ones (notes in
+        # particular) never leave the database.
+        columns = CONTACT_COLUMNS if fields is None else [getattr(Contact, field) for field in fields]
+        return select(*columns).where(Contact.user_id == self.user_id)
+
+    async def get(self, contact_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        result = await self.session.execute(self._select(fields).where(Contact.id == contact_id))
+        row = result.mappings().first()
+        return dict(row) if row else None
+
+    async def _bump_change_seq(self):
+        """Bump the owner's change sequence inside the current transaction."""
+        statement = pg_insert(ContactChangeSeq).values(user_id=self.user_id, seq=1)
+        await self.session.execute(statement.on_conflict_do_update(
+            index_elements=[ContactChangeSeq.user_id],
+            set_={"seq": ContactChangeSeq.seq + 1},
+        ))
+
+    async def _write_tags(self, tags_by_id: Dict[int, Optional[str]], replace: bool = False):
+        """Mirror the comma-separated tags of contacts into contact_tags."""
+        if replace:
+            await self.session.execute(
+                delete(ContactTag).where(ContactTag.contact_id.in_(list(tags_by_id)))
+            )
+        rows = [
+            {"contact_id": contact_id, "tag": tag}
+            for contact_id, tags in tags_by_id.items()
+            for tag in split_tags(tags)
+        ]
+        if rows:
+            await self.session.execute(insert(ContactTag), rows)
+
+    async def create(self, contact: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.session.execute(
+            insert(Contact).values(user_id=self.user_id, **contact).returning(*CONTACT_COLUMNS)
+        )
+        created = dict(result.mappings().one())
+        await self._write_tags({created["id"]: created["tags"]})
+        await self._bump_change_seq()
+        await self.session.commit()
+        return created
+
+    async def create_many(self, contacts: List[Dict[str, Any]]) -> int:
+        if not contacts:
+            return 0
+        result = await self.session.execute(
+            insert(Contact).returning(Contact.id, Contact.tags),
+            [{**contact, "user_id": self.user_id} for contact in contacts],
+        )
+        await self._write_tags({contact_id: tags for contact_id, tags in result})
+        await self._bump_change_seq()
+        await self.session.commit()
+        return len(contacts)
+
+    async def update(self, contact_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not changes:
+            return await self.get(contact_id)
+        result = await self.session.execute(
+            update(Contact)
+            .where(Contact.user_id == self.user_id, Contact.id == contact_id)
+            .values(**changes, version=Contact.version + 1)
+            .returning(*CONTACT_COLUMNS)
+        )
+        row = result.mappings().first()
+        if row:
+            if "tags" in changes:
+                await self._write_tags({contact_id: row["tags"]}, replace=True)
+            await self._bump_change_seq()
+        await self.session.commit()
+        return dict(row) if row else None
+
+    async def delete(self, contact_id: int) -> bool:
+        result = await self.session.execute(
+            delete(Contact)
+            .where(Contact.user_id == self.user_id, Contact.id == contact_id)
+            .returning(Contact.id)
+        )
+        deleted = result.first() is not None
+        if deleted:
+            await self._bump_change_seq()
+        await self.session.commit()
+        return deleted
+
+    def _matching(self, ids: Optional[List[int]], criteria: Dict[str, Any]) -> list:
+        conditions = [Contact.user_id == self.user_id]
+        if ids is not None:
+            conditions.append(Contact.id.in_(ids))
+        if criteria.get("company"):
+            conditions.append(Contact.company == criteria["company"])
+        if criteria.get("tags"):
+            conditions.append(Contact.id.in_(self._tagged(criteria["tags"], "all")))
+        if criteria.get("is_active") is not None:
+            conditions.append(Contact.is_active.is_(criteria["is_active"]))
+        return conditions
+
+    async def update_many(self, ids, criteria, changes) -> List[int]:
+        result = await self.session.execute(
+            update(Contact)
+            .where(*self._matching(ids, criteria))
+            .values(**changes, version=Contact.version + 1)
+            .returning(Contact.id, Contact.tags)
+            .execution_options(synchronize_session=False)
+        )
+        updated = {contact_id: tags for contact_id, tags in result}
+        if updated:
+            if "tags" in changes:
+                await self._write_tags(updated, replace=True)
+            await self._bump_change_seq()
+        await self.session.commit()
+        return sorted(updated)
+
+    async def delete_many(self, ids, criteria) -> List[int]:
+        result = await self.session.execute(
+            delete(Contact)
+            .where(*self._matching(ids, criteria))
+            .returning(Contact.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = sorted(result.scalars())
+        if deleted:
+            await self._bump_change_seq()
+        await self.session.commit()
+        return deleted
+
+    @staticmethod
+    def _tagged(tags: List[str], tag_match: str):
+        """Subquery of contact ids having all (or any) of tags, via the tag index."""
+        normalized = list(dict.fromkeys(tag.strip().lower() for tag in tags))
+        tagged = select(ContactTag.contact_id).where(ContactTag.tag.in_(normalized))
+        if tag_match != "any":
+            tagged = tagged.group_by(ContactTag.contact_id).having(
+                func.count(ContactTag.tag) == len(normalized)
+            )
+        return tagged
+
+    async def page(self, after_id, limit, fields=None) -> List[Dict[str, Any]]:
+        query = self._select(fields)
+        if after_id is not None:
+            query = query.where(Contact.id > after_id)
+        result = await self.session.execute(query.order_by(Contact.id).limit(limit))
+        return [dict(row) for row in result.mappings()]
+
+    async def search(self, q, company, tags, tag_match, after_id, limit, fields=None) -> List[Dict[str, Any]]:
+        query = self._select(fields)
+        if q:
+            pattern = _like_pattern(q)
+            query = query.where(or_(
+                Contact.first_name.ilike(pattern, escape="\\"),
+                Contact.last_name.ilike(pattern, escape="\\"),
+                Contact.email.ilike(pattern, escape="\\"),
+                Contact.company.ilike(pattern, escape="\\"),
+            ))
+        if company:
+            query = query.where(Contact.company.ilike(_like_pattern(company), escape="\\"))
+        if tags:
+            query = query.where(Contact.id.in_(self._tagged(tags, tag_match)))
+        if after_id is not None:
+            query = query.where(Contact.id > after_id)
+        result = await self.session.execute(query.order_by(Contact.id).limit(limit))
+        return [dict(row) for row in result.mappings()]
+
+    async def fulltext(self, query, after, limit) -> List[Dict[str, Any]]:
+        # websearch_to_tsquery accepts user input as-is: quoted phrases, "or"
+        # and -exclusions, and never raises on stray syntax
+        tsquery = func.websearch_to_tsquery("english", query)
+        rank = func.ts_rank(Contact.search_vector, tsquery)
+        statement = self._select().add_columns(rank.label("rank")).where(
+            Contact.search_vector.op("@@")(tsquery)
+        )
+        if after is not None:
+            after_rank, after_id = after
+            statement = statement.where(or_(
+                rank < after_rank,
+                and_(rank == after_rank, Contact.id > after_id),
+            ))
+        result = await self.session.execute(statement.order_by(rank.desc(), Contact.id).limit(limit))
+        return [dict(row) for row in result.mappings()]
+
+    async def stats(self) -> Dict[str, Any]:
+        totals = await self.session.execute(
+            select(
+                func.count(),
+                func.count().filter(Contact.is_active.is_(True)),
+            ).where(Contact.user_id == self.user_id)
+        )
+        total, active = totals.one()
+        by_company = await self.session.execute(
+            select(Contact.company, func.count())
+            .where(Contact.user_id == self.user_id, Contact.company.isnot(None), Contact.company != "")
+            .group_by(Contact.company)
+        )
+        contacts_by_company = {company: count for company, count in by_company}
+        return {
+            "total_contacts": total,
+            "active_contacts": active,
+            "inactive_contacts": total - active,
+            "unique_companies": len(contacts_by_company),
+            "contacts_by_company": contacts_by_company,
+        }
+
+    async def get_versioned(self, contact_id, fields=None) -> Optional[Tuple[int, Dict[str, Any]]]:
+        # Version in the same round trip; it is not a field, so it cannot collide
+        statement = self._select(fields).add_columns(Contact.version).where(Contact.id == contact_id)
+        row = (await self.session.execute(statement)).mappings().first()
+        if row is None:
+            return None
+        record = dict(row)
+        return record.pop("version"), record
+
+    async def change_seq(self) -> int:
+        seq = await self.session.scalar(
+            select(ContactChangeSeq.seq).where(ContactChangeSeq.user_id == self.user_id)
+        )
+        return seq or 0
+
+    async def iter_batches(self, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        # Streams from a server-side cursor on a session of its own, since
+        # the response body outlives the request-scoped session. It is bound
+        # to the same engine, so exports from a reader stay on the replica.
+        async with AsyncSession(self.session.bind, expire_on_commit=False) as session:
+            result = await session.stream(
+                self._select().order_by(Contact.id).execution_options(yield_per=batch_size)
+            )
+            async for partition in result.mappings().partitions(batch_size):
+                yield [dict(row) for row in partition]
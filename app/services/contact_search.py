@@ -0,0 +1,75 @@
+"""
+Trigram inverted index for case-insensitive substring search.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+GRAM_SIZE = 3
+
+
+def trigrams(text: str) -> Set[str]:
+    """Get the set of trigrams in a lowercased string."""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def intersect(*sets: Optional[Set[int]]) -> Optional[Set[int]]:
+    """Intersect candidate sets, smallest first. None means "no constraint"."""
+    constrained = sorted((s for s in sets if s is not None), key=len)
+    if not constrained:
+        return None
+    result = set(constrained[0])
+    for ids in constrained[1:]:
+        if not result:
+            break
+        result &= ids
+    return result
+
+
+class TrigramIndex:
+    """Maps trigrams of the indexed fields to the ids of records containing them.
+
+    The index only narrows the candidate set; callers still verify each
+    candidate with a real substring check, since trigrams can come from
+    different fields or appear out of order.
+    """
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def add(self, record_id: int, record: Dict[str, Any]):
+        """Index a record's fields."""
+        for gram in self._record_grams(record):
+            self._postings[gram].add(record_id)
+
+    def remove(self, record_id: int, record: Dict[str, Any]):
+        """Drop a record's fields from the index."""
+        for gram in self._record_grams(record):
+            ids = self._postings.get(gram)
+            if ids is None:
+                continue
+            ids.discard(record_id)
+            if not ids:
+                del self._postings[gram]
+
+    def candidates(self, query: str) -> Optional[Set[int]]:
+        """Get ids that may contain query, or None if it is too short to index."""
+        query_grams = trigrams(query.lower())
+        if not query_grams:
+            return None
+
+        postings = []
+        for gram in query_grams:
+            ids = self._postings.get(gram)
+            if not ids:
+                return set()
+            postings.append(ids)
+        return intersect(*postings)
+
+    def _record_grams(self, record: Dict[str, Any]) -> Iterable[str]:
+        grams: Set[str] = set()
+        for field in self.fields:
+            value = record.get(field)
+            if value:
+                grams |= trigrams(value.lower())
+        return grams
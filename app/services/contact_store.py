@@ -0,0 +1,272 @@
+"""
+In-memory contact store with primary and secondary indexes.
+"""
+from bisect import bisect_right, insort
+from collections import Counter, defaultdict
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.services.contact_fulltext import FullTextIndex
+from app.services.contact_search import TrigramIndex, intersect
+
+SEARCH_FIELDS = ("first_name", "last_name", "email", "company")
+
+
+def split_tags(tags: Optional[str]) -> List[str]:
+    """Split a comma-separated tag string into unique normalized tags."""
+    if not tags:
+        return []
+    return list(dict.fromkeys(tag.strip().lower() for tag in tags.split(",") if tag.strip()))
+
+
+class ContactStore:
+    """Contact records keyed by id, with indexes on company, email and tags.
+
+    Each record carries a version that is bumped on update, and the store
+    keeps a change_seq that is bumped on every write, for cheap ETags.
+    """
+
+    def __init__(self, contacts: Optional[Iterable[Dict[str, Any]]] = None):
+        self._contacts: Dict[int, Dict[str, Any]] = {}
+        self._ids: List[int] = []  # sorted, for keyset pagination
+        self._by_company: Dict[str, Set[int]] = defaultdict(set)
+        self._by_email: Dict[str, Set[int]] = defaultdict(set)
+        self._by_tag: Dict[str, Set[int]] = defaultdict(set)
+        self._search_index = TrigramIndex(SEARCH_FIELDS)
+        self._company_index = TrigramIndex(("company",))
+        self._fulltext_index = FullTextIndex()
+        self._active_count = 0
+        self._company_counts: Counter = Counter()
+        self._next_id = 1
+        self.change_seq = 0
+
+        for contact in contacts or []:
+            self.add(contact)
+
+    def __len__(self) -> int:
+        return len(self._contacts)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._contacts.values())
+
+    def __contains__(self, contact_id: int) -> bool:
+        return contact_id in self._contacts
+
+    def add(self, contact: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a contact record, assigning an id if it has none."""
+        if contact.get("id") is None:
+            contact["id"] = self._next_id
+        contact_id = contact["id"]
+        if contact_id in self._contacts:
+            raise KeyError(f"Contact {contact_id} already exists")
+
+        contact["version"] = 1
+        self._contacts[contact_id] = contact
+        if not self._ids or contact_id > self._ids[-1]:
+            self._ids.append(contact_id)
+        else:
+            insort(self._ids, contact_id)
+        self._next_id = max(self._next_id, contact_id + 1)
+        self._index(contact)
+        self.change_seq += 1
+        return contact
+
+    def add_many(self, contacts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of contact records."""
+        return [self.add(contact) for contact in contacts]
+
+    def get(self, contact_id: int) -> Optional[Dict[str, Any]]:
+        """Get a contact by id."""
+        return self._contacts.get(contact_id)
+
+    def update(self, contact_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply field changes to a contact and refresh its index entries."""
+        contact = self._contacts.get(contact_id)
+        if contact is None:
+            return None
+
+        self._unindex(contact)
+        contact.update(changes)
+        contact["version"] += 1
+        self._index(contact)
+        self.change_seq += 1
+        return contact
+
+    def delete(self, contact_id: int) -> Optional[Dict[str, Any]]:
+        """Remove a contact, returning the removed record."""
+        contact = self._contacts.pop(contact_id, None)
+        if contact is not None:
+            del self._ids[bisect_right(self._ids, contact_id) - 1]
+            self._unindex(contact)
+            self.change_seq += 1
+        return contact
+
+    def select_ids(
+        self,
+        ids: Optional[Iterable[int]] = None,
+        company: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        is_active: Optional[bool] = None,
+    ) -> List[int]:
+        """Get the sorted ids of contacts matching every given criterion.
+
+        company is an exact match and tags must all be present; both are
+        resolved from the secondary indexes.
+        """
+        candidates = intersect(
+            {contact_id for contact_id in ids if contact_id in self._contacts} if ids is not None else None,
+            self._by_company.get(company, set()) if company else None,
+            self._tag_candidates(tags, "all") if tags else None,
+        )
+        if candidates is None:
+            candidates = self._contacts.keys()
+        if is_active is not None:
+            return sorted(i for i in candidates if bool(self._contacts[i].get("is_active")) == is_active)
+        return sorted(candidates)
+
+    def page(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get contacts in id order, starting after after_id."""
+        start = bisect_right(self._ids, after_id) if after_id is not None else 0
+        end = start + limit if limit is not None else None
+        return [self._contacts[contact_id] for contact_id in self._ids[start:end]]
+
+    def by_company(self, company: str) -> List[Dict[str, Any]]:
+        """Get contacts whose company matches exactly."""
+        return self._lookup(self._by_company, company)
+
+    def by_email(self, email: str) -> List[Dict[str, Any]]:
+        """Get contacts with the given email, ignoring case."""
+        return self._lookup(self._by_email, email.lower())
+
+    def by_tag(self, tag: str) -> List[Dict[str, Any]]:
+        """Get contacts carrying the given tag, ignoring case."""
+        return self._lookup(self._by_tag, tag.strip().lower())
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        company: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = "all",
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search contacts, ordered by id.
+
+        q is a case-insensitive substring of first_name, last_name, email or
+        company, and company a substring of company. The trigram indexes
+        narrow the candidates and only those are checked against the actual
+        field values. tags are exact, normalized tags resolved from the tag
+        index; tag_match is "all" or "any". Results start after after_id
+        and stop at limit, like page().
+        """
+        candidates = intersect(
+            self._search_index.candidates(q) if q else None,
+            self._company_index.candidates(company) if company else None,
+            self._tag_candidates(tags, tag_match) if tags else None,
+        )
+        start = bisect_right(self._ids, after_id) if after_id is not None else 0
+        if candidates is None:
+            ids: Iterable[int] = (self._ids[i] for i in range(start, len(self._ids)))
+        else:
+            ids = sorted(candidates)
+            ids = ids[bisect_right(ids, after_id):] if after_id is not None else ids
+        records = (self._contacts[contact_id] for contact_id in ids)
+
+        q_lower = q.lower() if q else None
+        company_lower = company.lower() if company else None
+        matches = (
+            c for c in records
+            if (not q_lower or any(c.get(field) and q_lower in c[field].lower() for field in SEARCH_FIELDS))
+            and (not company_lower or (c.get("company") and company_lower in c["company"].lower()))
+        )
+        return list(islice(matches, limit))
+
+    def fulltext(
+        self,
+        query: str,
+        after: Optional[Tuple[float, int]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Full-text search over names, company and notes, best match first.
+
+        Each result is a copy of the record with its rank added; after is
+        the (rank, id) of the last result of the previous page.
+        """
+        return [
+            dict(self._contacts[contact_id], rank=rank)
+            for contact_id, rank in self._fulltext_index.search(query, after=after, limit=limit)
+        ]
+
+    def _tag_candidates(self, tags: List[str], tag_match: str) -> Set[int]:
+        tag_sets = [self._by_tag.get(tag.strip().lower(), set()) for tag in tags]
+        if tag_match == "any":
+            return set().union(*tag_sets)
+        return intersect(*tag_sets)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get contact counters, maintained on every write."""
+        total = len(self._contacts)
+        return {
+            "total_contacts": total,
+            "active_contacts": self._active_count,
+            "inactive_contacts": total - self._active_count,
+            "unique_companies": len(self._company_counts),
+            "contacts_by_company": dict(self._company_counts),
+        }
+
+    def reconcile_stats(self) -> bool:
+        """Rebuild the counters from the records; return whether they were correct."""
+        active_count = sum(1 for c in self._contacts.values() if c.get("is_active"))
+        company_counts = Counter(c["company"] for c in self._contacts.values() if c.get("company"))
+        consistent = active_count == self._active_count and company_counts == self._company_counts
+        self._active_count = active_count
+        self._company_counts = company_counts
+        return consistent
+
+    def _lookup(self, index: Dict[str, Set[int]], key: str) -> List[Dict[str, Any]]:
+        ids = index.get(key)
+        if not ids:
+            return []
+        return [self._contacts[contact_id] for contact_id in sorted(ids)]
+
+    def _index(self, contact: Dict[str, Any]):
+        contact_id = contact["id"]
+        self._search_index.add(contact_id, contact)
+        self._company_index.add(contact_id, contact)
+        self._fulltext_index.add(contact_id, contact)
+        if contact.get("is_active"):
+            self._active_count += 1
+        if contact.get("company"):
+            self._company_counts[contact["company"]] += 1
+            self._by_company[contact["company"]].add(contact_id)
+        if contact.get("email"):
+            self._by_email[contact["email"].lower()].add(contact_id)
+        for tag in split_tags(contact.get("tags")):
+            self._by_tag[tag].add(contact_id)
+
+    def _unindex(self, contact: Dict[str, Any]):
+        contact_id = contact["id"]
+        self._search_index.remove(contact_id, contact)
+        self._company_index.remove(contact_id, contact)
+        self._fulltext_index.remove(contact_id, contact)
+        if contact.get("is_active"):
+            self._active_count -= 1
+        if contact.get("company"):
+            self._company_counts[contact["company"]] -= 1
+            if not self._company_counts[contact["company"]]:
+                del self._company_counts[contact["company"]]
+            self._discard(self._by_company, contact["company"], contact_id)
+        if contact.get("email"):
+            self._discard(self._by_email, contact["email"].lower(), contact_id)
+        for tag in split_tags(contact.get("tags")):
+            self._discard(self._by_tag, tag, contact_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[int]], key: str, contact_id: int):
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.discard(contact_id)
+        if not ids:
+            del index[key]
@@ -0,0 +1,87 @@
+"""
+Benchmark: cached responses stored as JSON values vs raw (optionally compressed) bytes.
+
+For a JSON payload of each size, stores one entry per format in Redis and
+reports the hit latency (Redis GET plus building the response CacheMiddleware
+sends) and the Redis memory each entry uses. Needs a Redis server in
+REDIS_URL and the application's settings environment. Run from the
+repository root:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/cache_entry_bench.py [hits]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+import redis.asyncio as aioredis
+from fastapi.responses import JSONResponse, Response
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.middleware import CachedResponse, _compress, _decompress, zstandard  # noqa: E402
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+KEY_PREFIX = "bench:cache-entry"
+PAYLOAD_ROWS = (10, 200, 5_000)
+HEADERS = [("content-type", "application/json")]
+
+
+def payload(rows: int) -> dict:
+    """Something shaped like a dashboard statistics response."""
+    return {
+        "total": rows,
+        "by_company": [
+            {"company": f"Company {i}", "contacts": i * 7 % 97, "last_contacted": "2026-10-01T12:00:00Z"}
+            for i in range(rows)
+        ],
+    }
+
+
+async def main(hits: int):
+    client = aioredis.from_url(REDIS_URL)
+    encodings = [None, "gzip"] + (["zstd"] if zstandard is not None else [])
+
+    async def json_hit(key: str) -> Response:
+        # Previous format: parse the cached JSON and re-render it
+        return JSONResponse(content=json.loads(await client.get(key)))
+
+    def raw_hit(accept: bool):
+        async def hit(key: str) -> Response:
+            entry = CachedResponse.loads(await client.get(key))
+            body = entry.body if accept else _decompress(entry.body, entry.encoding)
+            return Response(content=body, status_code=entry.status_code, headers=dict(entry.headers))
+        return hit
+
+    print(f"hits={hits:,} per case")
+    print(f"{'rows':>6} {'format':<22} {'body bytes':>11} {'redis bytes':>12} {'hit µs':>9}")
+    try:
+        for rows in PAYLOAD_ROWS:
+            body = json.dumps(payload(rows)).encode()
+            cases = [("json value", body.decode(), json_hit)]
+            for encoding in encodings:
+                entry = CachedResponse(time.time(), 200, HEADERS, encoding, _compress(body, encoding))
+                name = f"raw {encoding or 'uncompressed'}"
+                cases.append((name, entry.dumps(), raw_hit(accept=True)))
+                if encoding is not None:
+                    cases.append((f"{name} (decoded)", entry.dumps(), raw_hit(accept=False)))
+
+            for name, value, hit in cases:
+                key = f"{KEY_PREFIX}:{rows}:{name}"
+                await client.set(key, value)
+                memory = await client.memory_usage(key)
+                await hit(key)  # warm up
+                start = time.perf_counter()
+                for _ in range(hits):
+                    await hit(key)
+                elapsed = time.perf_counter() - start
+                print(f"{rows:>6} {name:<22} {len(body):>11,} {memory:>12,} {elapsed / hits * 1e6:>9.1f}")
+    finally:
+        keys = [key async for key in client.scan_iter(f"{KEY_PREFIX}:*")]
+        if keys:
+            await client.delete(*keys)
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000))
@@ -0,0 +1,86 @@
+"""
+Benchmark: DedupIndex runtime and recall on synthetic contacts.
+
+Every tenth contact gets a planted duplicate (email case change, dropped
+or swapped name letters, company suffix), either without an email or with
+its own address. Recall is reported per kind of duplicate. Run from the
+repository root:
+    python benchmarks/contact_dedup_bench.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.contact_dedup import DedupIndex
+
+SIZES = [10_000, 100_000, 1_000_000]
+FIRST_NAMES = ["John", "Jane", "Michael", "Sarah", "David", "Laura", "Robert", "Emily", "Daniel", "Anna"]
+COMPANY_WORDS = ["Tech", "Design", "Global", "Blue", "North", "Alpha", "Green", "Bright", "Urban", "Prime"]
+VARIANTS = ["email_case", "name_typo", "name_typo_email", "company_suffix", "company_suffix_email"]
+
+
+def make_contacts(n: int, rng: random.Random):
+    """Generate about n contacts and the planted duplicate pairs, mapped to their variant."""
+    contacts = []
+    planted = {}
+    next_id = 1
+    while len(contacts) < n:
+        first = rng.choice(FIRST_NAMES)
+        last = f"{rng.choice('BCDFGHKLMNPRST')}{rng.choice('aeiou')}{rng.choice('lnrst')}son{next_id % 997}"
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)} {next_id % 5000}"
+        email = f"{first.lower()}.{last.lower()}@example.com"
+        original = {"id": next_id, "first_name": first, "last_name": last, "company": company, "email": email}
+        contacts.append(original)
+        next_id += 1
+
+        if next_id % 10 == 0:
+            variant = rng.choice(VARIANTS)
+            duplicate = dict(original, id=next_id)
+            if variant == "email_case":
+                duplicate["email"] = email.upper()
+            elif variant.startswith("name_typo"):
+                duplicate["first_name"] = first[:-1] if len(first) > 3 else first + "n"
+                # jon.doe@ for john.doe@
+                duplicate["email"] = f"{duplicate['first_name'].lower()}.{last.lower()}@example.com"
+            else:
+                duplicate["company"] = company + " Inc."
+                # A second address, at the company rather than the personal one
+                duplicate["email"] = f"{first[0].lower()}{last.lower()}@{company.split()[-1]}.example.org"
+            if not variant.endswith("_email") and variant != "email_case":
+                duplicate["email"] = None
+            contacts.append(duplicate)
+            planted[(original["id"], duplicate["id"])] = variant
+            next_id += 1
+    return contacts, planted
+
+
+def bench(n: int):
+    rng = random.Random(n)
+    contacts, planted = make_contacts(n, rng)
+
+    start = time.perf_counter()
+    index = DedupIndex()
+    index.add_many(contacts)
+    indexed = time.perf_counter()
+    pairs = index.candidate_pairs()
+    blocked = time.perf_counter()
+    suggestions = index.suggestions()
+    scored = time.perf_counter()
+
+    found = {(s.primary_id, s.duplicate_id) for s in suggestions}
+    recall = len(found & planted.keys()) / len(planted) if planted else 1.0
+    print(f"n={len(contacts):>9,}  index {indexed - start:6.2f}s  block {blocked - indexed:6.2f}s  "
+          f"score {scored - blocked:6.2f}s  pairs {len(pairs):>9,}  suggestions {len(suggestions):>8,}  "
+          f"recall {recall:.3f}")
+    for variant in VARIANTS:
+        pairs_of_variant = {pair for pair, kind in planted.items() if kind == variant}
+        if pairs_of_variant:
+            print(f"    {variant:<22} recall {len(found & pairs_of_variant) / len(pairs_of_variant):.3f}")
+
+
+if __name__ == "__main__":
+    for size in SIZES:
+        bench(size)
@@ -0,0 +1,121 @@
+"""
+Benchmark: InMemoryContactRepository vs SqlContactRepository.
+
+Needs a Postgres database in DATABASE_URL with the schema created by
+init_db(). Seeds contacts under a throwaway user and removes them
+afterwards. Run from the repository root:
+    DATABASE_URL=postgresql+asyncpg://... python benchmarks/contact_repository_bench.py [n]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, text
+
+from app.core.database import AsyncSessionLocal, init_db
+from app.models.contact import Contact
+from app.models.user import User
+from app.services.contact_repository import InMemoryContactRepository, SqlContactRepository
+from app.services.contact_store import ContactStore
+
+BENCH_USER_ID = 900_000_001
+SEED_BATCH_SIZE = 5_000
+ROUNDS = 200
+
+
+def make_contact(i: int):
+    return {
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "email": f"user{i}@example.com",
+        "phone": None,
+        "company": f"Company {i % 1000}",
+        "position": None,
+        "notes": None,
+        "tags": f"tag{i % 50}",
+        "is_active": i % 10 != 0,
+    }
+
+
+async def timed(fn, rounds: int = ROUNDS) -> float:
+    """Return the mean time per awaited call in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await fn()
+    return (time.perf_counter() - start) / rounds * 1e3
+
+
+async def run_suite(name: str, repo, n: int):
+    middle = n // 2
+    results = {
+        "get by id": await timed(lambda: repo.get(middle)),
+        "first page (100)": await timed(lambda: repo.page(None, 100)),
+        "deep page (100)": await timed(lambda: repo.page(n - 200, 100)),
+        "search q": await timed(lambda: repo.search(q="user4242@", limit=100)),
+        "search company": await timed(lambda: repo.search(company="company 7", limit=100)),
+        "stats": await timed(lambda: repo.stats(), rounds=20),
+    }
+    print(f"{name}")
+    for label, ms in results.items():
+        print(f"  {label:<18} {ms:10.3f} ms")
+
+
+async def main(n: int):
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        session.add(User(id=BENCH_USER_ID, email="bench@example.com", username="contacts-bench",
+                         hashed_password="-"))
+        await session.commit()
+
+        sql_repo = SqlContactRepository(session, user_id=BENCH_USER_ID)
+        store = ContactStore()
+        try:
+            for start in range(0, n, SEED_BATCH_SIZE):
+                batch = [make_contact(i) for i in range(start, min(start + SEED_BATCH_SIZE, n))]
+                await sql_repo.create_many(batch)
+            await session.execute(text("ANALYZE contacts"))
+
+            # Mirror the ids Postgres assigned so both suites hit the same rows
+            async for batch in sql_repo.iter_batches(SEED_BATCH_SIZE):
+                store.add_many(batch)
+            first_id = store.page(limit=1)[0]["id"]
+            offset_repo = _Offset(sql_repo, first_id - 1)
+            offset_store = _Offset(InMemoryContactRepository(store), first_id - 1)
+
+            print(f"n={n:,}")
+            await run_suite("in-memory", offset_store, n)
+            await run_suite("postgres", offset_repo, n)
+        finally:
+            await session.execute(delete(Contact).where(Contact.user_id == BENCH_USER_ID))
+            await session.execute(delete(User).where(User.id == BENCH_USER_ID))
+            await session.commit()
+
+
+class _Offset:
+    """Shift the benchmark's 1-based ids onto the ids that were assigned."""
+
+    def __init__(self, repo, offset: int):
+        self.repo = repo
+        self.offset = offset
+
+    def get(self, contact_id):
+        return self.repo.get(contact_id + self.offset)
+
+    def page(self, after_id, limit):
+        return self.repo.page(None if after_id is None else after_id + self.offset, limit)
+
+    def search(self, q=None, company=None, tags=None, tag_match="all", after_id=None, limit=100):
+        return self.repo.search(
+            q=q, company=company, tags=tags, tag_match=tag_match,
+            after_id=None if after_id is None else after_id + self.offset, limit=limit,
+        )
+
+    def stats(self):
+        return self.repo.stats()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,92 @@
+"""
+Microbenchmark: linear list scans vs the indexed ContactStore.
+
+Run from the repository root:
+    python benchmarks/contact_store_bench.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.contact_store import ContactStore
+
+SIZES = [10_000, 100_000, 1_000_000]
+LOOKUPS = 1_000
+
+
+def make_contacts(n: int):
+    """Generate n synthetic contact records."""
+    return [
+        {
+            "id": i,
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "email": f"user{i}@example.com",
+            "phone": None,
+            "company": f"Company {i % 1000}",
+            "position": None,
+            "notes": None,
+            "tags": f"tag{i % 50},tier{i % 3}",
+            "is_active": True,
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    """Return the mean time per call in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench(n: int):
+    contacts = make_contacts(n)
+    store = ContactStore(dict(c) for c in contacts)
+    target = n // 2
+    repeat = max(10, LOOKUPS * 10_000 // n)
+
+    linear_get = timed(lambda: next((c for c in contacts if c["id"] == target), None), repeat)
+    store_get = timed(lambda: store.get(target), LOOKUPS * 100)
+
+    linear_company = timed(lambda: [c for c in contacts if c["company"] == "Company 7"], repeat)
+    store_company = timed(lambda: store.by_company("Company 7"), LOOKUPS)
+
+    def linear_search(q):
+        q = q.lower()
+        return [c for c in contacts
+                if any(c[f] and q in c[f].lower() for f in ("first_name", "last_name", "email", "company"))]
+
+    linear_q = timed(lambda: linear_search("user4242@"), repeat)
+    store_q = timed(lambda: store.search(q="user4242@"), LOOKUPS)
+
+    first_page = timed(lambda: store.page(limit=100), LOOKUPS)
+    deep_page = timed(lambda: store.page(after_id=n - 200, limit=100), LOOKUPS)
+
+    store_update = timed(lambda: store.update(target, {"company": "Company 8"}), LOOKUPS)
+
+    next_id = [n + 1]
+
+    def create_delete():
+        contact = store.add({"id": next_id[0], "first_name": "Bench", "email": "b@example.com",
+                             "company": "Bench Co", "tags": "bench", "is_active": True})
+        store.delete(contact["id"])
+        next_id[0] += 1
+
+    store_create_delete = timed(create_delete, LOOKUPS)
+
+    print(f"n={n:>9,}")
+    print(f"  get by id        linear {linear_get:12.2f} us   store {store_get:8.2f} us")
+    print(f"  filter company   linear {linear_company:12.2f} us   store {store_company:8.2f} us")
+    print(f"  search q=        linear {linear_q:12.2f} us   store {store_q:8.2f} us")
+    print(f"  page of 100      first  {first_page:12.2f} us   deep  {deep_page:8.2f} us")
+    print(f"  update                                    store {store_update:8.2f} us")
+    print(f"  create + delete                           store {store_create_delete:8.2f} us")
+
+
+if __name__ == "__main__":
+    for size in SIZES:
+        bench(size)
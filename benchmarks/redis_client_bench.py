@@ -0,0 +1,85 @@
+"""
+Benchmark: blocking redis client vs a shared redis.asyncio pool on one event loop.
+
+Simulates concurrent requests that each do a cache GET plus a SETEX, as
+CacheMiddleware does on a miss, and reports throughput and how long the
+event loop was stalled. Needs a Redis server in REDIS_URL. Run from the
+repository root:
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/redis_client_bench.py [concurrency] [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import redis
+import redis.asyncio as aioredis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+KEY_PREFIX = "bench:redis-client"
+TICK = 0.001
+
+
+async def loop_lag(stop: asyncio.Event) -> float:
+    """Return the longest delay of a 1 ms timer while the benchmark ran."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        worst = max(worst, time.perf_counter() - start - TICK)
+    return worst
+
+
+async def run(name: str, handle, concurrency: int, total: int):
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            await handle(queue.get_nowait())
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag
+    print(f"{name:<18} {total / elapsed:10,.0f} req/s   worst loop stall {worst_lag * 1e3:8.2f} ms")
+
+
+async def main(concurrency: int, total: int):
+    sync_client = redis.from_url(REDIS_URL, decode_responses=True)
+    pool = aioredis.BlockingConnectionPool.from_url(
+        REDIS_URL, max_connections=min(concurrency, 50), timeout=1.0, decode_responses=True
+    )
+    async_client = aioredis.Redis(connection_pool=pool)
+
+    async def blocking(i: int):
+        key = f"{KEY_PREFIX}:{i % 1000}"
+        if sync_client.get(key) is None:
+            sync_client.setex(key, 60, "x" * 512)
+
+    async def pooled(i: int):
+        key = f"{KEY_PREFIX}:{i % 1000}"
+        if await async_client.get(key) is None:
+            await async_client.setex(key, 60, "x" * 512)
+
+    print(f"concurrency={concurrency} requests={total:,}")
+    try:
+        for name, handle in (("sync redis", blocking), ("redis.asyncio pool", pooled)):
+            await async_client.delete(*[f"{KEY_PREFIX}:{i}" for i in range(1000)])
+            await run(name, handle, concurrency, total)
+    finally:
+        await async_client.delete(*[f"{KEY_PREFIX}:{i}" for i in range(1000)])
+        await async_client.aclose()
+        await pool.disconnect()
+        sync_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20_000,
+    ))